@@ -0,0 +1,2 @@
+
+# Benchmark and load-test tooling for the service-order API
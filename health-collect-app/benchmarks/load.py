@@ -0,0 +1,173 @@
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+# Every list route of service_orders_bp; the SSE /stream route is long-lived and left out
+ROUTES = {
+    'all': '/api/service-orders',
+    'all_columns': '/api/service-orders?format=columns',
+    'all_ndjson': '/api/service-orders?format=ndjson',
+    'all_paginated': '/api/service-orders?limit=100',
+    'new': '/api/service-orders/new',
+    'today': '/api/service-orders/today',
+    'pending': '/api/service-orders/pending',
+    'technician': '/api/service-orders/technician/' + quote('KAUA, SARA'),
+    'status': '/api/service-orders/status/' + quote('Concluída'),
+    'query': '/api/service-orders/query?' + urlencode({'status': 'Aberta', 'technician': 'KAUA, SARA'}),
+    'history': '/api/service-orders/query?' + urlencode({'status': 'Concluída', 'limit': 100}),
+    'stats': '/api/service-orders/stats?exclude_supplies=1'
+}
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+def timed_request(url, headers, timeout):
+    """(latency in seconds, HTTP status or 0 on connection errors, body bytes)"""
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as response:
+            size = len(response.read())
+            status = response.status
+    except HTTPError as e:
+        size = len(e.read())
+        status = e.code
+    except (URLError, OSError):
+        size = 0
+        status = 0
+    return time.perf_counter() - start, status, size
+
+def run_route(url, requests, concurrency, headers=None, timeout=30, warmup=0):
+    """Issue `requests` GETs with `concurrency` clients and summarize them"""
+    headers = headers or {}
+    for _ in range(warmup):
+        timed_request(url, headers, timeout)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        samples = list(executor.map(lambda _: timed_request(url, headers, timeout), range(requests)))
+        elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed)
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, status, _ in samples if 200 <= status < 400)
+    sizes = [size for _, status, size in samples if 200 <= status < 400]
+    errors = sum(1 for _, status, _ in samples if not 200 <= status < 400)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'max': ms(latencies[-1]) if latencies else None
+        },
+        'bytes': {
+            'mean': round(sum(sizes) / len(sizes)) if sizes else None,
+            'total': sum(sizes)
+        }
+    }
+
+def run(base_url, routes, requests, concurrency, accept_encoding='gzip', timeout=30, warmup=5, label=None):
+    """Benchmark every route, returning the machine-readable report"""
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    report = {
+        'meta': {
+            'label': label,
+            'base_url': base_url,
+            'requests': requests,
+            'concurrency': concurrency,
+            'accept_encoding': accept_encoding,
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version()
+        },
+        'routes': {}
+    }
+    for name, path in routes.items():
+        result = run_route(base_url.rstrip('/') + path, requests, concurrency, headers, timeout, warmup)
+        report['routes'][name] = result
+        latency = result['latency_ms']
+        print(f"{name:15} p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+              f"{result['throughput']} req/s {result['bytes']['mean']} bytes erros={result['errors']}",
+              file=sys.stderr)
+    return report
+
+def compare(report, baseline, tolerance=0.2):
+    """Regressions of `report` against `baseline`: p95 latency or throughput worse than the tolerance"""
+    regressions = []
+    for name, result in report['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            continue
+        p95, previous_p95 = result['latency_ms']['p95'], previous['latency_ms']['p95']
+        if p95 is not None and previous_p95 and p95 > previous_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous_p95}ms -> {p95}ms")
+        throughput, previous_throughput = result['throughput'], previous['throughput']
+        if throughput is not None and previous_throughput and throughput < previous_throughput * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous_throughput} -> {throughput} req/s")
+        if result['errors'] > previous['errors']:
+            regressions.append(f"{name}: erros {previous['errors']} -> {result['errors']}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas /api/service-orders*")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--requests', type=int, default=200, help="requisições por rota")
+    parser.add_argument('--concurrency', type=int, default=8, help="clientes simultâneos")
+    parser.add_argument('--warmup', type=int, default=5, help="requisições por rota antes de medir")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--routes', help=f"subconjunto separado por vírgulas de: {', '.join(ROUTES)}")
+    parser.add_argument('--accept-encoding', default='gzip', help="vazio para respostas sem compressão")
+    parser.add_argument('--label', help="descrição do cenário (ex.: 100k linhas)")
+    parser.add_argument('--output', help="grava o relatório JSON neste arquivo em vez da saída padrão")
+    parser.add_argument('--baseline', help="relatório anterior para comparar; sai com 1 se houver regressão")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    routes = ROUTES
+    if args.routes:
+        names = [name.strip() for name in args.routes.split(',') if name.strip()]
+        unknown = [name for name in names if name not in ROUTES]
+        if unknown:
+            print(f"Rotas desconhecidas: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        routes = {name: ROUTES[name] for name in names}
+
+    report = run(args.url, routes, args.requests, args.concurrency, args.accept_encoding,
+                 args.timeout, args.warmup, args.label)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
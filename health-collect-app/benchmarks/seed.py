@@ -0,0 +1,182 @@
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from src.api.classification import is_supply
+from src.api.database import DB_CONFIG, create_connection
+from src.api.migrations import apply_migrations
+from src.api.stats import refresh_backlog_stats
+
+# Shape of the tables before the versioned migrations (which add fl_suprimento and the indexes)
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tb_top_rank (
+        id_top_rank INT AUTO_INCREMENT PRIMARY KEY,
+        cd_os VARCHAR(20) NOT NULL,
+        solicitacao DATETIME NULL,
+        previsao VARCHAR(20) NULL,
+        servico_sol VARCHAR(500) NULL,
+        setor_sol VARCHAR(255) NULL,
+        solicitante VARCHAR(255) NULL,
+        sit VARCHAR(50) NULL,
+        atend_dia VARCHAR(255) NULL,
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_top_rank_cd_os (cd_os)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_manu_compara (
+        id_manu_compara INT AUTO_INCREMENT PRIMARY KEY,
+        cd_os_manu_compara VARCHAR(20) NOT NULL,
+        solicitacao_manu_compara DATETIME NULL,
+        previsao_manu_compara VARCHAR(20) NULL,
+        servico_sol_manu_compara VARCHAR(500) NULL,
+        setor_sol_manu_compara VARCHAR(255) NULL,
+        solicitante_manu_compara VARCHAR(255) NULL,
+        atend_dia_manu_compara VARCHAR(255) NULL
+    )
+    """
+]
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# Vocabulary of the synthetic orders; roughly one in six services is a supply request
+TECHNICIANS = ('MARCOS, WESLLEY', 'KAUA, SARA', 'JOAO, PAULO', 'ANA, BEATRIZ', 'RAFAEL', '')
+SECTORS = ('UTI ADULTO', 'PRONTO SOCORRO', 'CENTRO CIRURGICO', 'RECEPCAO', 'FARMACIA',
+           'LABORATORIO', 'RADIOLOGIA', 'FATURAMENTO', 'ALMOXARIFADO', 'DIRETORIA')
+SERVICES = ('Computador não liga', 'Sem acesso ao sistema', 'Impressora não imprime',
+            'Troca de toner', 'Configurar e-mail', 'Mouse com defeito', 'Rede sem conexão',
+            'Instalar programa', 'Cartucho colorida', 'Ramal mudo', 'Senha bloqueada', 'TV sem sinal')
+REQUESTERS = ('MARIA SILVA', 'JOSE SANTOS', 'ANA SOUZA', 'CARLOS LIMA', 'PAULA ROCHA', 'LUCAS ALVES')
+CLOSED_STATUS = 'Concluída'
+OPEN_STATUSES = ('Aberta', 'Em andamento', 'Aguardando peça')
+
+INSERT_TOP_RANK = """
+INSERT INTO tb_top_rank (cd_os, solicitacao, previsao, servico_sol, setor_sol, solicitante, sit, atend_dia, fl_suprimento)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_MANU_COMPARA = """
+INSERT INTO tb_manu_compara
+(cd_os_manu_compara, solicitacao_manu_compara, previsao_manu_compara,
+ servico_sol_manu_compara, setor_sol_manu_compara,
+ solicitante_manu_compara, atend_dia_manu_compara)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+def generate_rows(count, open_rows, seed=42, history_days=730, now=None):
+    """Deterministic synthetic tb_top_rank rows; the last `open_rows` are the open panel snapshot
+
+    History spreads over `history_days`; open orders fall in the last 30 days,
+    with a share of them today so the /new and /today routes return data.
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    first_open = count - open_rows
+    for index in range(count):
+        is_open = index >= first_open
+        if is_open:
+            age = rng.randint(0, 12 * 60) if rng.random() < 0.2 else rng.randint(0, 30 * 1440)
+        else:
+            age = rng.randint(30 * 1440, history_days * 1440)
+        solicitacao = now - timedelta(minutes=age)
+        servico_sol = rng.choice(SERVICES)
+        yield (
+            str(100000 + index),
+            solicitacao.strftime('%Y-%m-%d %H:%M:%S'),
+            (solicitacao + timedelta(days=2)).strftime('%d/%m/%y %H:%M'),
+            servico_sol,
+            rng.choice(SECTORS),
+            rng.choice(REQUESTERS),
+            rng.choice(OPEN_STATUSES) if is_open else CLOSED_STATUS,
+            rng.choice(TECHNICIANS),
+            int(is_supply(servico_sol))
+        )
+
+def create_schema(connection, reset=False):
+    cursor = connection.cursor()
+    try:
+        if reset:
+            for table in ('tb_manu_compara', 'tb_top_rank', 'tb_schema_version'):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        connection.commit()
+    finally:
+        cursor.close()
+    apply_migrations(connection)
+
+def seed(connection, rows, open_rows, batch_size=5000, seed=42, reset=False):
+    """Replace the contents of tb_top_rank/tb_manu_compara with `rows` synthetic orders"""
+    create_schema(connection, reset)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM tb_manu_compara")
+        cursor.execute("DELETE FROM tb_top_rank")
+        connection.commit()
+
+        start = time.monotonic()
+        batch = []
+        inserted = 0
+        open_snapshot = []
+        for row in generate_rows(rows, open_rows, seed):
+            batch.append(row)
+            if row[6] != CLOSED_STATUS:
+                open_snapshot.append(row[:6] + (row[7],))
+            if len(batch) >= batch_size:
+                cursor.executemany(INSERT_TOP_RANK, batch)
+                connection.commit()
+                inserted += len(batch)
+                batch = []
+                print(f"  {inserted}/{rows} registros ({time.monotonic() - start:.0f}s)")
+        if batch:
+            cursor.executemany(INSERT_TOP_RANK, batch)
+            inserted += len(batch)
+
+        for offset in range(0, len(open_snapshot), batch_size):
+            cursor.executemany(INSERT_MANU_COMPARA, open_snapshot[offset:offset + batch_size])
+        refresh_backlog_stats(cursor)
+        connection.commit()
+
+        # Fresh statistics so EXPLAIN and the benchmark see realistic plans
+        for table in ('tb_top_rank', 'tb_manu_compara'):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+        return inserted, len(open_snapshot)
+    finally:
+        cursor.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Popula um MySQL/MariaDB local com ordens de serviço sintéticas")
+    parser.add_argument('--rows', type=int, default=10000, help="total de ordens em tb_top_rank (10k a 5M)")
+    parser.add_argument('--open-rows', type=int, default=500, help="ordens abertas, copiadas para tb_manu_compara")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help="recria as tabelas do zero")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="permite popular um banco fora de localhost (apaga os dados existentes)")
+    args = parser.parse_args(argv)
+
+    if DB_CONFIG['host'] not in LOCAL_HOSTS and not args.allow_remote:
+        print(f"Recusado: DB_HOST={DB_CONFIG['host']} não é local; use --allow-remote para confirmar")
+        return 2
+    if not 0 <= args.open_rows <= args.rows:
+        print("--open-rows deve estar entre 0 e --rows")
+        return 2
+
+    connection = create_connection()
+    if not connection:
+        print("Falha na conexão com o banco de dados")
+        return 1
+    try:
+        print(f"Populando {DB_CONFIG['host']}/{DB_CONFIG['database']} com {args.rows} ordens...")
+        inserted, compara = seed(connection, args.rows, args.open_rows, args.batch_size, args.seed, args.reset)
+        print(f"tb_top_rank: {inserted} registros, tb_manu_compara: {compara} registros")
+    finally:
+        connection.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
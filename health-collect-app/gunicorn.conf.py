@@ -0,0 +1,92 @@
+
+# Production entry point of the API:
+#     gunicorn src.api.server:app
+# (gunicorn reads this file from the working directory). Reload code and
+# configuration without dropping requests with `kill -HUP <master pid>`.
+import multiprocessing
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+bind = os.environ.get('API_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('API_WORKERS', multiprocessing.cpu_count()))
+# Threads let one worker serve several requests while others wait on MySQL.
+# An open /api/service-orders/stream client holds a thread for as long as it
+# stays connected, so each worker accepts at most API_STREAM_MAX_CLIENTS streams
+# (default: half of the threads) and answers 503 beyond that; total stream
+# capacity is workers * API_STREAM_MAX_CLIENTS.
+worker_class = 'gthread'
+threads = int(os.environ.get('API_THREADS', 4))
+
+# Seconds of silence before a worker is killed, and allowed for in-flight requests on reload/shutdown
+timeout = int(os.environ.get('API_WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('API_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('API_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('API_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('API_MAX_REQUESTS_JITTER', 500))
+
+# Each worker imports the app (and opens its own connection pool) after the fork
+preload_app = False
+
+accesslog = os.environ.get('API_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Nothing from src.api is imported in the master: workers forked after a HUP
+# must load the new code, not modules inherited from the master's sys.modules.
+
+def wait_for_store(address, timeout=5.0):
+    """Block until the store accepts connections ("host:port" or a Unix socket path)"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        family, target = socket.AF_INET, (host, int(port))
+    else:
+        family, target = socket.AF_UNIX, address
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as probe:
+                probe.connect(target)
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+# The master owns the shared result cache when API_CACHE_BACKEND=shared and
+# API_CACHE_EXTERNAL is not set (i.e. the store is not run separately). The
+# handle lives on the arbiter because a HUP reload re-executes this file.
+# Without API_CACHE_AUTHKEY a random key is generated here; the store and the
+# workers inherit it through the environment. An external store needs the key set.
+# The workers also share a directory for /metrics (API_METRICS_DIR, see metrics.py).
+def on_starting(server):
+    server.cache_process = None
+    server.metrics_dir = None
+    if not os.environ.get('API_METRICS_DIR'):
+        server.metrics_dir = tempfile.mkdtemp(prefix='health-collect-metrics-')
+        os.environ['API_METRICS_DIR'] = server.metrics_dir
+
+    if os.environ.get('API_CACHE_BACKEND') == 'shared' and not os.environ.get('API_CACHE_EXTERNAL'):
+        os.environ.setdefault('API_CACHE_AUTHKEY', secrets.token_hex(32))
+        # Same default as cache.CACHE_ADDRESS
+        address = os.environ.setdefault('API_CACHE_ADDRESS', '127.0.0.1:50100')
+        # A plain subprocess, so forked workers do not inherit it as a child of their own
+        server.cache_process = subprocess.Popen(
+            [sys.executable, '-m', 'src.api.cache'], cwd=os.path.dirname(os.path.abspath(__file__)))
+        if wait_for_store(address):
+            server.log.info("Shared cache listening on %s (pid %s)", address, server.cache_process.pid)
+        else:
+            server.log.warning("Shared cache not reachable on %s; workers fall back to local caches", address)
+
+def on_exit(server):
+    process = getattr(server, 'cache_process', None)
+    if process is not None:
+        process.terminate()
+        process.wait(5)
+    if getattr(server, 'metrics_dir', None):
+        shutil.rmtree(server.metrics_dir, ignore_errors=True)
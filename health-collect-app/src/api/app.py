@@ -1,15 +1,30 @@
 
 from flask import Flask
 from flask_cors import CORS
+from src.api.async_database import async_available
+from src.api.compression import init_compression
+from src.api.metrics import init_metrics
 from src.api.routes.service_orders import service_orders_bp
+from src.api.routes.service_orders_async import service_orders_async_bp
+from src.api.routes.health import health_bp
+from src.api.serialization import ServiceOrderJSONProvider
 
 def create_app():
     """Factory function to create and configure the Flask app"""
     app = Flask(__name__)
-    CORS(app)
+    app.json = ServiceOrderJSONProvider(app)
+    # Expose the validators so the frontend can send conditional requests
+    CORS(app, expose_headers=['ETag', 'Last-Modified', 'X-Next-Cursor', 'X-Total-Count', 'Link'])
     
+    # Registered first so its after_request hook runs last and sees the final response
+    init_metrics(app)
+    init_compression(app)
+
     # Register blueprints
     app.register_blueprint(service_orders_bp)
+    app.register_blueprint(health_bp)
+    if async_available():
+        app.register_blueprint(service_orders_async_bp)
     
     return app
 
@@ -0,0 +1,149 @@
+
+import asyncio
+import atexit
+import os
+import re
+import threading
+import time
+from src.api.database import DB_CONFIG
+from src.api.metrics import record_query
+
+# Optional dependencies: aiomysql for the driver, asgiref (flask[async]) for async views
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+try:
+    import asgiref
+except ImportError:
+    asgiref = None
+
+ASYNC_POOL_MIN = int(os.environ.get('DB_ASYNC_POOL_MIN', 1))
+ASYNC_POOL_MAX = int(os.environ.get('DB_ASYNC_POOL_MAX', 10))
+ASYNC_QUERY_TIMEOUT = float(os.environ.get('DB_ASYNC_QUERY_TIMEOUT', 30))
+
+# Any "%" that is not a "%s" placeholder, e.g. the DATE_FORMAT patterns of serialization.py
+LITERAL_PERCENT = re.compile(r'%(?!s)')
+
+def async_available():
+    """True when the async driver and Flask's async view support are installed"""
+    return aiomysql is not None and asgiref is not None
+
+def escape_literal_percent(query, params):
+    """Adapt SQL written for mysql.connector to aiomysql
+
+    With parameters, aiomysql interpolates them with Python's `query % args`,
+    so literal "%" signs must be doubled; mysql.connector only substitutes "%s".
+    """
+    if not params:
+        return query
+    return LITERAL_PERCENT.sub('%%', query)
+
+class AsyncDatabase:
+    """aiomysql pool running on a dedicated event-loop thread
+
+    Flask runs every async view in a short-lived loop of its own, so the pool
+    cannot live there: queries are submitted to this loop and awaited from
+    the caller's.
+    """
+
+    def __init__(self, minsize=ASYNC_POOL_MIN, maxsize=ASYNC_POOL_MAX, timeout=ASYNC_QUERY_TIMEOUT):
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._loop = None
+        self._pool = None
+        self._pool_lock = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            # Threads do not survive a fork: every worker process starts its own loop
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pool = None
+                self._pool_lock = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name='db-async-loop', daemon=True).start()
+            return self._loop
+
+    async def _get_pool(self):
+        # Runs on the dedicated loop, so the asyncio lock is only ever used there
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await aiomysql.create_pool(
+                    host=DB_CONFIG['host'],
+                    port=DB_CONFIG['port'],
+                    user=DB_CONFIG['user'],
+                    password=DB_CONFIG['password'],
+                    db=DB_CONFIG['database'],
+                    connect_timeout=DB_CONFIG['connection_timeout'],
+                    autocommit=True,
+                    minsize=self.minsize,
+                    maxsize=self.maxsize,
+                    pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800))
+                )
+        return self._pool
+
+    async def _execute(self, query, params):
+        pool = await self._get_pool()
+        async with pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(escape_literal_percent(query, params), params or None)
+                return await cursor.fetchall()
+
+    async def execute_query(self, query, params=None):
+        """Awaitable from any event loop; returns (result, error) like database.execute_query"""
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(self._execute(query, params), self._ensure_loop())
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            result = list(result)
+            record_query(time.perf_counter() - start, query, params, len(result))
+            return result, None
+        except asyncio.TimeoutError as e:
+            future.cancel()
+            print(f"Tempo esgotado na query assíncrona após {self.timeout}s")
+            record_query(time.perf_counter() - start, query, params, error=e)
+            return None, "Tempo esgotado na consulta ao banco de dados"
+        except aiomysql.OperationalError as e:
+            print(f"Erro de conexão MySQL: {str(e)}")
+            record_query(time.perf_counter() - start, query, params, error=e)
+            return None, "Falha na conexão com o banco de dados"
+        except Exception as e:
+            print(f"Erro ao executar query: {str(e)}")
+            record_query(time.perf_counter() - start, query, params, error=e)
+            return None, str(e)
+
+    def close(self):
+        with self._lock:
+            loop, pool = self._loop, self._pool
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = None
+
+        async def shutdown():
+            if pool is not None:
+                pool.close()
+                await pool.wait_closed()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+async_db = AsyncDatabase()
+atexit.register(async_db.close)
+
+async def execute_query_async(query, params=None):
+    """Execute a query on the async pool and return (result, error)"""
+    return await async_db.execute_query(query, params)
+
+async def gather_queries(*queries):
+    """Run independent (query, params) pairs concurrently, returning their (result, error) in order"""
+    return await asyncio.gather(*(execute_query_async(query, params) for query, params in queries))
@@ -0,0 +1,398 @@
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager
+from src.api.database import execute_query
+
+# Cache settings (overridable through environment variables)
+CACHE_TTL = float(os.environ.get('API_CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('API_CACHE_MAX_ENTRIES', 256))
+VERSION_CHECK_INTERVAL = float(os.environ.get('API_VERSION_CHECK_INTERVAL', 2))
+# "local" keeps results per process; "shared" uses a store process common to every worker
+CACHE_BACKEND = os.environ.get('API_CACHE_BACKEND', 'local')
+# Address of the store: "host:port" for TCP or a filesystem path for a Unix socket
+CACHE_ADDRESS = os.environ.get('API_CACHE_ADDRESS', '127.0.0.1:50100')
+# The store unpickles what clients send, so the key must be a secret: there is no default
+# (gunicorn.conf.py generates one for the store it starts)
+CACHE_AUTHKEY = os.environ.get('API_CACHE_AUTHKEY', '').encode('utf-8')
+# How long a worker computing a key keeps the others waiting before they compute too
+LEASE_TIMEOUT = float(os.environ.get('API_CACHE_LEASE_TIMEOUT', 30))
+LEASE_POLL_INTERVAL = 0.02
+# Seconds before retrying an unreachable store; meanwhile the process caches locally
+RECONNECT_INTERVAL = float(os.environ.get('API_CACHE_RECONNECT_INTERVAL', 5))
+
+# Cheap probe of what the collector (painel_acma.py) last committed
+DATA_VERSION_QUERY = """
+    SELECT
+        (SELECT MAX(timestamp) FROM tb_top_rank) as last_update,
+        (SELECT COUNT(*) FROM tb_manu_compara) as compara_count,
+        CURDATE() as today
+"""
+
+_MISSING = object()
+
+class ResultCache:
+    """LRU cache of query results with TTL, tagged with the data version they were built from"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (version, expires_at, value)
+        self._key_locks = {}
+        self._version_marker = None  # (version, observed_at, last_update, checked_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, version, record=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                if record:
+                    self._stats['misses'] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            if record:
+                self._stats['hits'] += 1
+            return entry[2]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def key_lock(self, key):
+        """Per-key lock so concurrent misses run the query only once"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._key_locks.clear()
+        self._stats['invalidations'] += 1
+
+    def read_version(self):
+        """Last published data-version marker, or None"""
+        with self._lock:
+            return self._version_marker
+
+    def publish_version(self, version, last_update):
+        """Record a freshly probed data version, invalidating on change; returns the marker"""
+        with self._lock:
+            marker = self._version_marker
+            changed = marker is None or marker[0] != version
+            if changed and marker is not None:
+                self._clear()
+            # HTTP dates have one-second resolution
+            observed_at = datetime.now(timezone.utc).replace(microsecond=0) if changed else marker[1]
+            self._version_marker = (version, observed_at, last_update, time.time())
+            return self._version_marker
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'max_entries': self.max_entries, 'ttl': self.ttl})
+        return stats
+
+class DataVersion:
+    """Throttled probe of the data version, invalidating the cache whenever it changes
+
+    The version marker lives in the cache backend, so with a shared backend a
+    single worker probes the database per interval and the others adopt it.
+    """
+
+    def __init__(self, cache, check_interval=VERSION_CHECK_INTERVAL):
+        self.cache = cache
+        self.check_interval = check_interval
+        self._version = None
+        self._last_update = None
+        self._observed_at = None
+        self._checked_at = None
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def current(self):
+        """Return the current version token, or None when it cannot be determined
+
+        One thread probes at a time and the lock is not held during the query:
+        the others keep the last result (None after a failed probe, which is
+        also kept for check_interval), so a database outage costs one connect
+        timeout per interval instead of one per request.
+        """
+        with self._cond:
+            while True:
+                if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                    return self._version
+                if not self._probing:
+                    break
+                if self._checked_at is not None:
+                    return self._version
+                # Nothing known yet (process start): wait for the probe in flight
+                self._cond.wait()
+            self._probing = True
+
+        marker = None
+        try:
+            marker = self._probe()
+        finally:
+            with self._cond:
+                if marker is None:
+                    self._version = None
+                else:
+                    self._version, self._observed_at, self._last_update = marker[:3]
+                self._checked_at = time.monotonic()
+                self._probing = False
+                self._cond.notify_all()
+        return marker[0] if marker is not None else None
+
+    def _probe(self):
+        """Version marker from the cache backend, querying the database when it is stale"""
+        marker = self.cache.read_version()
+        if marker is not None and time.time() - marker[3] < self.check_interval:
+            return marker
+        result, error = execute_query(DATA_VERSION_QUERY)
+        if error or not result:
+            return None
+
+        row = result[0]
+        last_update = row['last_update']
+        # The database's day is part of the version: "dias" (DATEDIFF against
+        # CURDATE()) and the CURDATE() filters change only at its midnight
+        version = f"{last_update.isoformat() if last_update else ''}:{row['compara_count']}:{row['today'].isoformat()}"
+        return self.cache.publish_version(version, last_update)
+
+    @property
+    def last_update(self):
+        return self._last_update
+
+    @property
+    def last_modified(self):
+        """UTC time at which the current version was first seen, used as Last-Modified"""
+        return self._observed_at
+
+def require_authkey():
+    """Refuse to run the shared backend with a key anyone could guess"""
+    if not CACHE_AUTHKEY:
+        raise RuntimeError("API_CACHE_AUTHKEY não definido: obrigatório com API_CACHE_BACKEND=shared")
+    return CACHE_AUTHKEY
+
+def parse_address(address):
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host, int(port)
+    return address
+
+class CacheStore(ResultCache):
+    """ResultCache living in the store process, plus leases for cross-process single-flight"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        super().__init__(max_entries, ttl)
+        self._leases = {}  # key -> (owner, expires_at)
+
+    def acquire_lease(self, key, owner, timeout=LEASE_TIMEOUT):
+        """True when `owner` may compute `key`; expired leases of crashed workers are taken over"""
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] != owner and lease[1] > now:
+                return False
+            self._leases[key] = (owner, now + timeout)
+            return True
+
+    def release_lease(self, key, owner):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] == owner:
+                del self._leases[key]
+
+    def lookup(self, key, version, record=True):
+        """(found, value): the _MISSING sentinel does not survive pickling"""
+        value = self.get(key, version, record)
+        return (False, None) if value is _MISSING else (True, value)
+
+_store = None
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = CacheStore()
+    return _store
+
+class CacheManager(BaseManager):
+    pass
+
+CacheManager.register('store', callable=_get_store)
+
+class SharedCache:
+    """Client of the cross-process store with the ResultCache interface
+
+    Every worker reads and writes the same entries and data-version marker, so
+    adding workers does not multiply database load. When the store is
+    unreachable the process falls back to a private ResultCache.
+    """
+
+    def __init__(self, address=CACHE_ADDRESS, authkey=CACHE_AUTHKEY, lease_timeout=LEASE_TIMEOUT):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.lease_timeout = lease_timeout
+        self.fallback = ResultCache()
+        self._store = None
+        self._pid = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Proxies must not be shared with a forked child: reconnect per process
+        with self._lock:
+            if self._store is not None and self._pid == os.getpid():
+                return self._store
+            if time.monotonic() < self._retry_at:
+                return None
+            try:
+                manager = CacheManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._store = manager.store()
+                self._pid = os.getpid()
+                return self._store
+            except (OSError, EOFError, AuthenticationError) as e:
+                print(f"Cache compartilhado indisponível em {self.address}: {e}")
+                self._store = None
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+                return None
+
+    def _call(self, method, *args):
+        """Call the store; returns _MISSING when it is unreachable"""
+        store = self._connect()
+        if store is None:
+            return _MISSING
+        try:
+            return getattr(store, method)(*args)
+        except (OSError, EOFError) as e:
+            print(f"Falha no cache compartilhado: {e}")
+            with self._lock:
+                self._store = None
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+            return _MISSING
+
+    def _call_or_fallback(self, method, *args):
+        result = self._call(method, *args)
+        if result is _MISSING:
+            return getattr(self.fallback, method)(*args)
+        return result
+
+    def get(self, key, version, record=True):
+        result = self._call('lookup', key, version, record)
+        if result is _MISSING:
+            return self.fallback.get(key, version, record)
+        found, value = result
+        return value if found else _MISSING
+
+    def set(self, key, version, value):
+        self._call_or_fallback('set', key, version, value)
+
+    @contextmanager
+    def key_lock(self, key):
+        """Single-flight per key: a thread lock within the process, a lease across processes"""
+        with self.fallback.key_lock(key):
+            owner = f"{os.getpid()}:{threading.get_ident()}"
+            deadline = time.monotonic() + self.lease_timeout
+            leased = False
+            while not leased and time.monotonic() < deadline:
+                # Without the store the thread lock alone is enough
+                leased = self._call('acquire_lease', key, owner, self.lease_timeout)
+                if leased is _MISSING:
+                    break
+                if not leased:
+                    time.sleep(LEASE_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                if leased is True:
+                    self._call('release_lease', key, owner)
+
+    def invalidate(self):
+        self._call_or_fallback('invalidate')
+
+    def read_version(self):
+        return self._call_or_fallback('read_version')
+
+    def publish_version(self, version, last_update):
+        return self._call_or_fallback('publish_version', version, last_update)
+
+    def stats(self):
+        stats = dict(self._call_or_fallback('stats'))
+        stats['backend'] = 'shared' if self._store is not None else 'local-fallback'
+        return stats
+
+def create_cache(backend=CACHE_BACKEND):
+    """Result cache for this process: "local" (in-process) or "shared" (cross-process store)"""
+    if backend == 'shared':
+        require_authkey()
+        return SharedCache()
+    return ResultCache()
+
+cache = create_cache()
+data_version = DataVersion(cache)
+
+def cached(key, compute):
+    """Return compute() for the current data version, as (result, error)
+
+    `compute` must return (result, error) like execute_query; errors are never cached.
+    """
+    version = data_version.current()
+    if version is None:
+        return compute()
+
+    result = cache.get(key, version)
+    if result is not _MISSING:
+        return result, None
+
+    with cache.key_lock(key):
+        result = cache.get(key, version, record=False)
+        if result is not _MISSING:
+            return result, None
+        result, error = compute()
+        if not error:
+            cache.set(key, version, result)
+        return result, error
+
+def get_cache_stats():
+    """Return the current statistics of the shared result cache"""
+    stats = cache.stats()
+    stats['data_version'] = data_version.current()
+    return stats
+
+if __name__ == '__main__':
+    # Standalone store, for deployments where the workers are not started through gunicorn.conf.py
+    address = parse_address(CACHE_ADDRESS)
+    manager = CacheManager(address=address, authkey=require_authkey())
+    # A Unix socket is created owner-only, so other local users cannot even attempt the handshake
+    previous_umask = os.umask(0o077)
+    try:
+        server = manager.get_server()
+    finally:
+        os.umask(previous_umask)
+    if isinstance(address, str):
+        os.chmod(address, 0o600)
+    print(f"Cache compartilhado em {CACHE_ADDRESS}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
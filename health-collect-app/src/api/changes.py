@@ -0,0 +1,148 @@
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from src.api.cache import data_version
+
+STREAM_MAX_EVENTS = int(os.environ.get('API_STREAM_MAX_EVENTS', 500))
+STREAM_POLL_INTERVAL = float(os.environ.get('API_STREAM_POLL_INTERVAL', 2))
+STREAM_HEARTBEAT = float(os.environ.get('API_STREAM_HEARTBEAT', 15))
+# Each connected stream holds a worker thread for as long as it stays open, so a
+# worker accepts at most this many at once and keeps the rest of its threads for
+# the other routes (default: half of the gunicorn threads)
+STREAM_MAX_CLIENTS = int(os.environ.get('API_STREAM_MAX_CLIENTS', max(1, int(os.environ.get('API_THREADS', 4)) // 2)))
+
+class StreamSlots:
+    """Per-process cap on concurrent streams"""
+
+    def __init__(self, limit=STREAM_MAX_CLIENTS):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """A release callback, or None when every slot is taken"""
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.active += 1
+        released = []
+
+        def release():
+            # Called once when the response is closed, whether or not it was ever iterated
+            if not released:
+                released.append(True)
+                with self._lock:
+                    self.active -= 1
+                self._semaphore.release()
+        return release
+
+    def stats(self):
+        return {'limit': self.limit, 'active': self.active, 'rejected': self.rejected}
+
+stream_slots = StreamSlots()
+
+def row_hash(row):
+    """Stable content hash of a formatted service-order row"""
+    payload = json.dumps(row, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class ChangeFeed:
+    """Turns data-version changes into deltas (inserted/updated/removed by cd_os)
+
+    A single detector runs per data version no matter how many clients are
+    connected; clients read from a bounded log of events and resume through
+    "<boot id>-<sequence>" tokens.
+    """
+
+    def __init__(self, load_snapshot, max_events=STREAM_MAX_EVENTS):
+        self.load_snapshot = load_snapshot
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._rows = None      # cd_os -> (hash, row)
+        self._version = None
+        self._seq = 0
+        self._events = deque(maxlen=max_events)  # (seq, payload)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    def token(self, seq):
+        return f"{self.boot_id}-{seq}"
+
+    def parse_token(self, token):
+        """Sequence number of a resume token, or None when it belongs to another process"""
+        if not token:
+            return None
+        boot_id, _, seq = token.rpartition('-')
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def poll(self):
+        """Detect a new data version and record its delta; cheap when nothing changed"""
+        version = data_version.current()
+        if version is None or version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            rows, error = self.load_snapshot()
+            if error:
+                print(f"Erro ao carregar snapshot para o stream: {error}")
+                return
+
+            current = {row['cd_os']: (row_hash(row), row) for row in rows}
+            if self._rows is not None:
+                inserted = [row for cd_os, (_, row) in current.items() if cd_os not in self._rows]
+                updated = [row for cd_os, (digest, row) in current.items()
+                           if cd_os in self._rows and self._rows[cd_os][0] != digest]
+                removed = [cd_os for cd_os in self._rows if cd_os not in current]
+                if inserted or updated or removed:
+                    self._seq += 1
+                    self._events.append((self._seq, {
+                        'version': version,
+                        'inserted': inserted,
+                        'updated': updated,
+                        'removed': removed
+                    }))
+                    self._cond.notify_all()
+            self._rows = current
+            self._version = version
+
+    def snapshot(self):
+        """(seq, rows) of the current state, or None while no baseline could be loaded
+
+        An empty list would be indistinguishable from "no open orders", and the
+        first successful load records no event, so the client would never catch up.
+        """
+        self.poll()
+        with self._lock:
+            if self._rows is None:
+                return None
+            return self._seq, [row for _, row in self._rows.values()]
+
+    def events_since(self, seq):
+        """Events after `seq`, or None when some of them were already dropped from the log"""
+        with self._lock:
+            if seq > self._seq:
+                return None
+            if seq < self._seq and (not self._events or self._events[0][0] > seq + 1):
+                return None
+            return [event for event in self._events if event[0] > seq]
+
+    def wait(self, seq, timeout):
+        """Block until an event newer than `seq` exists or `timeout` expires"""
+        with self._cond:
+            if self._seq <= seq:
+                self._cond.wait(timeout)
+
+def format_event(event, token, data):
+    """Serialize one Server-Sent Event"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {token}\nevent: {event}\ndata: {payload}\n\n"
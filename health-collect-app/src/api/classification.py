@@ -0,0 +1,54 @@
+
+import re
+from src.api.constants import FILTER_PATTERNS
+from src.api.stats import refresh_backlog_stats
+
+# Terms of FILTER_PATTERNS without the SQL wildcards, matched case-insensitively
+SUPPLY_TERMS = tuple(dict.fromkeys(p.strip('%').lower() for p in FILTER_PATTERNS))
+
+# Whole words only (plural allowed), like the collector's original regex: a plain
+# substring match would flag "retorne" (TORNE) or any word containing "tv"
+SUPPLY_PATTERN = re.compile(r'\b(?:' + '|'.join(map(re.escape, SUPPLY_TERMS)) + r')s?\b', re.IGNORECASE)
+
+def is_supply(servico_sol):
+    """True when the service description is a supply request (toner, cartridge, TV...)"""
+    return bool(servico_sol) and SUPPLY_PATTERN.search(servico_sol) is not None
+
+def reclassify_supplies(connection, batch_size=1000, refresh_stats=True):
+    """Recompute tb_top_rank.fl_suprimento for every row, returning how many changed
+
+    Run it whenever FILTER_PATTERNS changes. Rows are read in keyset batches of
+    `batch_size` so memory stays flat on large tables; everything is committed once.
+    Changed rows get a new `timestamp` (the API's data version) and tb_stats_backlog
+    is rebuilt in the same transaction, so the API never serves the old flags from
+    its cache, snapshot or summary. `refresh_stats=False` is for databases that do
+    not have the summary table yet (migration 1).
+    """
+    cursor = connection.cursor()
+    try:
+        changed = 0
+        last_cd_os = ''
+        while True:
+            cursor.execute(
+                "SELECT cd_os, servico_sol, fl_suprimento FROM tb_top_rank"
+                " WHERE cd_os > %s ORDER BY cd_os LIMIT %s",
+                (last_cd_os, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_cd_os = rows[-1][0]
+            changes = [(int(is_supply(servico_sol)), cd_os)
+                       for cd_os, servico_sol, flag in rows if int(is_supply(servico_sol)) != flag]
+            if changes:
+                cursor.executemany(
+                    "UPDATE tb_top_rank SET fl_suprimento = %s, timestamp = CURRENT_TIMESTAMP WHERE cd_os = %s",
+                    changes
+                )
+                changed += len(changes)
+        if changed and refresh_stats:
+            refresh_backlog_stats(cursor)
+        connection.commit()
+        return changed
+    finally:
+        cursor.close()
@@ -0,0 +1,79 @@
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from flask import request
+from src.api.metrics import timed_serialization
+
+# Brotli is optional (pip install Brotli); without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('API_BROTLI_QUALITY', 5))
+COMPRESSED_CACHE_SIZE = int(os.environ.get('API_COMPRESSED_CACHE_SIZE', 128))
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain')
+
+_compressed_cache = OrderedDict()  # (etag, encoding) -> bytes
+_cache_lock = threading.Lock()
+
+def choose_encoding():
+    """Best encoding accepted by the client (br > gzip), or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def compress_response(response):
+    """after_request hook compressing JSON bodies according to Accept-Encoding"""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    compressed = None
+    if etag:
+        # Same version, same bytes: compress once per ETag and encoding
+        with _cache_lock:
+            compressed = _compressed_cache.get((etag, encoding))
+    if compressed is None:
+        with timed_serialization():
+            compressed = compress(data, encoding)
+        if etag:
+            with _cache_lock:
+                _compressed_cache[(etag, encoding)] = compressed
+                while len(_compressed_cache) > COMPRESSED_CACHE_SIZE:
+                    _compressed_cache.popitem(last=False)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # Different bytes than the identity representation: the validator becomes weak
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,42 +1,264 @@
 
+import os
+import threading
+import time
+from contextlib import contextmanager
 import mysql.connector
-from flask import jsonify
+from src.api.metrics import record_query
+
+# Connection settings (overridable through environment variables)
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', '172.16.0.39'),
+    'user': os.environ.get('DB_USER', 'dbati'),
+    'password': os.environ.get('DB_PASSWORD', 'info@1543'),
+    'database': os.environ.get('DB_NAME', 'homologacao'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'auth_plugin': 'mysql_native_password',
+    # Seconds before an unreachable server counts as a failure (the driver default waits much longer)
+    'connection_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+    # Pooled connections must not keep a REPEATABLE READ snapshot open between requests
+    'autocommit': True
+}
+
+# Pool settings
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+# Rows fetched per round trip by stream_query
+STREAM_BATCH_SIZE = int(os.environ.get('DB_STREAM_BATCH_SIZE', 500))
+# A streamed response holds its connection until a possibly slow client has read
+# everything, so streams get their own budget within the pool and never starve
+# the other routes (default: half of the base pool)
+STREAM_MAX_CONNECTIONS = int(os.environ.get('DB_STREAM_MAX_CONNECTIONS', max(1, POOL_SIZE // 2)))
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class StreamLimitReached(Exception):
+    """Raised by stream_query when every streaming connection is in use"""
 
 def create_connection():
     """Create a connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host='172.16.0.39',
-            user='dbati',
-            password='info@1543',
-            database='homologacao',
-            port=3306,
-            auth_plugin='mysql_native_password'
-        )
+        connection = mysql.connector.connect(**DB_CONFIG)
         return connection
     except mysql.connector.Error as err:
         print(f"Erro de conexão MySQL: {err}")
         return None
 
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections with overflow, health checks and recycling"""
+
+    def __init__(self, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                 timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = []        # (connection, created_at), most recently used last
+        self._created_at = {}  # id(connection) -> created_at of checked out connections
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'opened': 0,
+            'closed': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0
+        }
+
+    def _open(self):
+        connection = create_connection()
+        if connection is None:
+            raise mysql.connector.InterfaceError("Falha na conexão com o banco de dados")
+        with self._cond:
+            self._stats['opened'] += 1
+        return connection, time.monotonic()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['closed'] += 1
+
+    def _is_healthy(self, connection, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['failed_pings'] += 1
+            return False
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds for one"""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._idle and self._in_use >= self.size + self.max_overflow:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['waits'] += 1
+                    self._stats['wait_time'] += time.monotonic() - start
+                    raise PoolTimeout("Tempo esgotado aguardando conexão do pool")
+                self._cond.wait(remaining)
+
+            entry = self._idle.pop() if self._idle else None
+            # Reserve the slot before leaving the lock so concurrent callers respect the limit
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += time.monotonic() - start
+
+        try:
+            if entry is not None and not self._is_healthy(*entry):
+                self._discard(entry[0])
+                entry = None
+            if entry is None:
+                entry = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        connection, created_at = entry
+        with self._cond:
+            self._created_at[id(connection)] = created_at
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, closing it when broken or above `size`"""
+        with self._cond:
+            created_at = self._created_at.pop(id(connection), time.monotonic())
+            self._in_use -= 1
+            keep = not discard and len(self._idle) < self.size
+            if keep:
+                self._idle.append((connection, created_at))
+            self._cond.notify()
+        if not keep:
+            self._discard(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except mysql.connector.Error:
+            discard = not connection.is_connected()
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def stats(self):
+        """Snapshot of the pool counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'wait_time': round(self._stats['wait_time'], 4),
+                'avg_wait_time': round(self._stats['wait_time'] / self._stats['waits'], 4)
+                if self._stats['waits'] else 0.0
+            })
+        return stats
+
+pool = ConnectionPool()
+
+def get_pool_stats():
+    """Return the current statistics of the shared connection pool"""
+    return pool.stats()
+
 def execute_query(query, params=None, dictionary=True):
     """Execute a query and return the results"""
-    connection = create_connection()
-    if not connection:
-        return None, "Falha na conexão com o banco de dados"
-    
+    start = time.perf_counter()
     try:
-        cursor = connection.cursor(dictionary=dictionary)
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        result = cursor.fetchall()
-        return result, None
+        with pool.connection() as connection:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                result = cursor.fetchall()
+                record_query(time.perf_counter() - start, query, params, len(result))
+                return result, None
+            finally:
+                cursor.close()
+    except (PoolTimeout, mysql.connector.InterfaceError) as e:
+        print(f"Erro de conexão MySQL: {str(e)}")
+        record_query(time.perf_counter() - start, query, params, error=e)
+        return None, "Falha na conexão com o banco de dados"
     except Exception as e:
         print(f"Erro ao executar query: {str(e)}")
+        record_query(time.perf_counter() - start, query, params, error=e)
         return None, str(e)
+
+_stream_budget = threading.BoundedSemaphore(STREAM_MAX_CONNECTIONS)
+_stream_stats = {'active': 0, 'rejected': 0}
+_stream_stats_lock = threading.Lock()
+
+def get_stream_stats():
+    """Connections held by streamed responses"""
+    with _stream_stats_lock:
+        return dict(_stream_stats, limit=STREAM_MAX_CONNECTIONS)
+
+def stream_query(query, params=None, batch_size=STREAM_BATCH_SIZE):
+    """Yield lists of rows from an unbuffered (server-side) cursor, keeping memory constant
+
+    The pooled connection is held until the generator is exhausted or closed.
+    Raises StreamLimitReached (on the first next()) when STREAM_MAX_CONNECTIONS
+    streams are already running.
+    """
+    if not _stream_budget.acquire(blocking=False):
+        with _stream_stats_lock:
+            _stream_stats['rejected'] += 1
+        raise StreamLimitReached(f"{STREAM_MAX_CONNECTIONS} streams em andamento")
+    with _stream_stats_lock:
+        _stream_stats['active'] += 1
+    try:
+        yield from _stream_rows(query, params, batch_size)
     finally:
-        if connection.is_connected():
+        with _stream_stats_lock:
+            _stream_stats['active'] -= 1
+        _stream_budget.release()
+
+def _stream_rows(query, params, batch_size):
+    start = time.perf_counter()
+    connection = pool.acquire()
+    cursor = None
+    exhausted = False
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params or ())
+        # Rows arrive while the response is being written; only execution counts as DB time
+        record_query(time.perf_counter() - start, query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        exhausted = True
+    finally:
+        if cursor is not None and exhausted:
             cursor.close()
-            connection.close()
+        # A connection with unread results cannot be reused
+        pool.release(connection, discard=not exhausted)
@@ -0,0 +1,66 @@
+
+import sys
+from datetime import date, timedelta
+from src.api.queries import ROUTE_FILTERS, build_service_orders_query
+
+# Sample values for the parameterized routes: /technician, /status and /query,
+# whose filters combine (several equality filters, a from/to date range)
+_range_end = date.today() + timedelta(days=1)
+SAMPLE_FILTERS = {
+    'technician': ({'technician': 'KAUA, SARA'}, 'desc'),
+    'status': ({'status': 'Concluída'}, 'desc'),
+    'query': ({'status': 'Aberta', 'technician': 'KAUA, SARA', 'exclude_supplies': True}, 'desc'),
+    'query date range': ({
+        'date_from': f"{_range_end - timedelta(days=30)} 00:00:00",
+        'date_to': f"{_range_end} 00:00:00"
+    }, 'desc')
+}
+
+def explain_query(connection, query, params):
+    """Rows of EXPLAIN for the given query"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def full_scans(plan):
+    """Plan rows that read tb_top_rank without an index
+
+    tb_manu_compara only holds the current panel snapshot (a few dozen rows),
+    so scanning it is expected when the optimizer drives the join from it.
+    """
+    return [row for row in plan if row.get('table') == 'tr' and (row.get('type') == 'ALL' or not row.get('key'))]
+
+def check_routes(connection, limit=None):
+    """EXPLAIN every route query, returning {route: (plan, full_scan_rows)}
+
+    Without `limit`, as the routes run them when the client does not paginate.
+    """
+    report = {}
+    for route, (filters, order) in {**ROUTE_FILTERS, **SAMPLE_FILTERS}.items():
+        query, params = build_service_orders_query(filters, order=order, limit=limit)
+        plan = explain_query(connection, query, params)
+        report[route] = (plan, full_scans(plan))
+    return report
+
+if __name__ == '__main__':
+    from src.api.database import create_connection
+
+    connection = create_connection()
+    if not connection:
+        print("Falha na conexão com o banco de dados")
+        sys.exit(1)
+    try:
+        report = check_routes(connection)
+    finally:
+        connection.close()
+
+    failed = False
+    for route, (plan, scans) in report.items():
+        print(f"[{'FALHA' if scans else 'OK'}] {route}")
+        for row in plan:
+            print(f"    {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+        failed = failed or bool(scans)
+    sys.exit(1 if failed else 0)
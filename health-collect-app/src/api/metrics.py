@@ -0,0 +1,252 @@
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request
+
+# Queries slower than this (milliseconds) are logged with their SQL and parameters; 0 disables
+SLOW_QUERY_MS = float(os.environ.get('API_SLOW_QUERY_MS', 0))
+
+# With several gunicorn workers, each process writes its counters and histograms
+# here and /metrics sums every file, so a scrape sees all workers and not just
+# the one that answered (set by gunicorn.conf.py). Files of exited workers stay,
+# keeping the counters monotonic.
+METRICS_DIR = os.environ.get('API_METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('API_METRICS_FLUSH_INTERVAL', 1))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def state(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(values, state):
+        for key, value in state:
+            key = tuple(key)
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, self.labels, key, value) for key, value in values.items()]
+
+class Histogram:
+    """Cumulative histogram keyed by label values, in the Prometheus bucket layout"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def state(self):
+        with self._lock:
+            return [[list(key), list(entry)] for key, entry in self._values.items()]
+
+    @staticmethod
+    def merge(values, state):
+        for key, entry in state:
+            key = tuple(key)
+            current = values.get(key)
+            values[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = {key: list(entry) for key, entry in self._values.items()}
+        samples = []
+        bucket_labels = self.labels + ('le',)
+        for key, entry in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                samples.append((self.name + '_bucket', bucket_labels, key + (bound,), cumulative))
+            samples.append((self.name + '_bucket', bucket_labels, key + ('+Inf',), entry[-1]))
+            samples.append((self.name + '_sum', self.labels, key, round(entry[-2], 6)))
+            samples.append((self.name + '_count', self.labels, key, entry[-1]))
+        return samples
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds', 'Time spent handling a request, until the response is returned',
+    ('route', 'method', 'status'))
+DB_TIME = Histogram(
+    'api_request_db_seconds', 'Time spent in MySQL per request', ('route',))
+SERIALIZATION_TIME = Histogram(
+    'api_request_serialization_seconds', 'Time spent encoding the response body per request', ('route',))
+ROWS_RETURNED = Histogram(
+    'api_request_rows', 'Rows fetched from MySQL per request', ('route',), buckets=ROWS_BUCKETS)
+QUERY_LATENCY = Histogram(
+    'api_query_duration_seconds', 'Duration of each MySQL query', ('route',))
+REQUEST_ERRORS = Counter(
+    'api_request_errors_total', 'Requests answered with a 5xx status', ('route', 'status'))
+QUERY_ERRORS = Counter(
+    'api_query_errors_total', 'MySQL queries that raised an error', ('route',))
+SLOW_QUERIES = Counter(
+    'api_slow_queries_total', 'Queries slower than API_SLOW_QUERY_MS', ('route',))
+
+METRICS = [REQUEST_LATENCY, DB_TIME, SERIALIZATION_TIME, ROWS_RETURNED, QUERY_LATENCY,
+           REQUEST_ERRORS, QUERY_ERRORS, SLOW_QUERIES]
+
+def flush_metrics():
+    """Write this process's counters and histograms to METRICS_DIR"""
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump({metric.name: metric.state() for metric in METRICS}, f)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"Falha ao gravar métricas em {path}: {e}")
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+def _flush_forever():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush_metrics()
+
+def start_metrics_flusher():
+    """Flush every METRICS_FLUSH_INTERVAL from a daemon thread, once per process (threads do not survive a fork)"""
+    global _flusher_pid
+    if not METRICS_DIR or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid != os.getpid():
+            _flusher_pid = os.getpid()
+            threading.Thread(target=_flush_forever, name='metrics-flush', daemon=True).start()
+
+def collect_metrics():
+    """{metric name: merged values} over every process that wrote to METRICS_DIR"""
+    flush_metrics()
+    merged = {metric.name: {} for metric in METRICS}
+    for filename in os.listdir(METRICS_DIR):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename)) as f:
+                states = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for metric in METRICS:
+            metric.merge(merged[metric.name], states.get(metric.name, []))
+    return merged
+
+def current_route():
+    """Route template of the current request ("background" outside of requests)"""
+    if not has_request_context():
+        return 'background'
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+def record_query(duration, query, params=None, rows=0, error=None):
+    """Account one MySQL query to the current request and log it when slow"""
+    route = current_route()
+    QUERY_LATENCY.observe(duration, route)
+    if error is not None:
+        QUERY_ERRORS.inc(route)
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + duration
+        g.db_rows = g.get('db_rows', 0) + rows
+    if SLOW_QUERY_MS and duration * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(route)
+        print(f"Query lenta ({duration * 1000:.1f} ms) em {route}: {' '.join(query.split())} params={params!r}")
+
+class timed_serialization:
+    """Context manager adding the elapsed time to the serialization time of the request"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if has_request_context():
+            g.serialization_time = g.get('serialization_time', 0.0) + time.perf_counter() - self.start
+        return False
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+def _record_request(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    route = current_route()
+    status = response.status_code
+    REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method, status)
+    if 'db_time' in g:
+        DB_TIME.observe(g.db_time, route)
+        ROWS_RETURNED.observe(g.db_rows, route)
+    if 'serialization_time' in g:
+        SERIALIZATION_TIME.observe(g.serialization_time, route)
+    if status >= 500:
+        REQUEST_ERRORS.inc(route, status)
+    start_metrics_flusher()
+    return response
+
+def init_metrics(app):
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+
+def render_metrics(gauges=()):
+    """Prometheus text exposition of every metric plus the given (name, description, kind, value) tuples
+
+    Counters and histograms cover every worker when METRICS_DIR is set; the
+    gauges describe only the process answering the scrape.
+    """
+    merged = collect_metrics() if METRICS_DIR else {}
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, values, value in metric.samples(merged.get(metric.name)):
+            lines.append(f"{name}{_format_labels(labels, values)} {value}")
+    for name, description, kind, value in gauges:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
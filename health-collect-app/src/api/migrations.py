@@ -0,0 +1,83 @@
+
+import sys
+from functools import partial
+from src.api.classification import reclassify_supplies
+from src.api.stats import create_backlog_stats
+
+# Versioned schema changes, applied in order. Each step is either a SQL
+# statement or a callable receiving the connection (data backfills).
+MIGRATIONS = [
+    (1, "Coluna fl_suprimento para classificação de suprimentos", [
+        "ALTER TABLE tb_top_rank ADD COLUMN fl_suprimento TINYINT(1) NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_top_rank_suprimento ON tb_top_rank (fl_suprimento, solicitacao)",
+        # tb_stats_backlog only exists from migration 3, which fills it
+        partial(reclassify_supplies, refresh_stats=False)
+    ]),
+    (2, "Índices para filtros de data, técnico, situação e o EXISTS em tb_manu_compara", [
+        "CREATE INDEX idx_top_rank_solicitacao ON tb_top_rank (solicitacao, cd_os)",
+        "CREATE INDEX idx_top_rank_atend_dia ON tb_top_rank (atend_dia, solicitacao)",
+        "CREATE INDEX idx_top_rank_sit ON tb_top_rank (sit, solicitacao)",
+        "CREATE INDEX idx_top_rank_timestamp ON tb_top_rank (timestamp)",
+        "CREATE INDEX idx_manu_compara_cd_os ON tb_manu_compara (cd_os_manu_compara)"
+    ]),
+    (3, "Tabela tb_stats_backlog com os agregados das ordens abertas", [
+        create_backlog_stats
+    ]),
+    (4, "Reclassificação de suprimentos por palavra inteira", [
+        reclassify_supplies
+    ])
+]
+
+def current_version(connection):
+    """Highest migration version applied to the database"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tb_schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM tb_schema_version")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def apply_migrations(connection):
+    """Apply every pending migration, returning the list of applied versions"""
+    version = current_version(connection)
+    applied = []
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        print(f"Aplicando migração {number}: {description}")
+        cursor = connection.cursor()
+        try:
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO tb_schema_version (version, description) VALUES (%s, %s)",
+                (number, description)
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+        applied.append(number)
+    return applied
+
+if __name__ == '__main__':
+    from src.api.database import create_connection
+
+    connection = create_connection()
+    if not connection:
+        print("Falha na conexão com o banco de dados")
+        sys.exit(1)
+    try:
+        applied = apply_migrations(connection)
+        print(f"Migrações aplicadas: {applied}" if applied else "Esquema já está atualizado")
+    finally:
+        connection.close()
@@ -0,0 +1,228 @@
+
+import base64
+import json
+from datetime import datetime, timedelta
+from src.api.serialization import iso_datetime_sql, iso_text_datetime_sql
+
+# Public field name -> SQL expression, in response order
+SERVICE_ORDER_FIELDS = {
+    'id_top_rank': 'tr.id_top_rank',
+    'cd_os': 'tr.cd_os',
+    'solicitacao': iso_datetime_sql('tr.solicitacao'),
+    'previsao': iso_text_datetime_sql('tr.previsao'),
+    'servico_sol': 'tr.servico_sol',
+    'setor_sol': 'tr.setor_sol',
+    'solicitante': 'tr.solicitante',
+    'sit': 'tr.sit',
+    # Calendar days, so the value only changes at midnight (when the data version does)
+    'dias': 'DATEDIFF(CURDATE(), tr.solicitacao)',
+    'atend_dia': 'tr.atend_dia',
+    'status': "CASE WHEN tr.sit = 'Concluída' THEN 'Concluída' ELSE 'Pendente' END",
+    'descricao': 'tr.servico_sol',
+    'timestamp': iso_datetime_sql('tr.timestamp')
+}
+
+# Columns the keyset cursor is built from
+CURSOR_FIELDS = ('solicitacao', 'cd_os')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Filters and order behind each fixed route
+ROUTE_FILTERS = {
+    'all': ({}, 'desc'),
+    'new': ({'unassigned': True, 'today': True, 'exclude_supplies': True}, 'asc'),
+    'today': ({'today': True, 'exclude_supplies': True}, 'asc'),
+    'pending': ({'unassigned': True, 'exclude_supplies': True}, 'asc')
+}
+
+class QueryError(ValueError):
+    """Invalid query parameters supplied by the client"""
+
+def parse_fields(value):
+    """Parse a comma separated `fields=` parameter into a tuple of known field names"""
+    if not value:
+        return tuple(SERVICE_ORDER_FIELDS)
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in SERVICE_ORDER_FIELDS]
+    if unknown or not fields:
+        raise QueryError(f"Campos inválidos: {', '.join(unknown) or value}")
+    return fields
+
+def parse_limit(value):
+    """Parse the `limit=` parameter; None means no pagination"""
+    if value is None or value == '':
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise QueryError("Parâmetro limit inválido")
+    if limit < 1:
+        raise QueryError("Parâmetro limit inválido")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(row):
+    """Opaque cursor pointing just after `row` in (solicitacao, cd_os) order"""
+    payload = json.dumps([row['solicitacao'], row['cd_os']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(value):
+    """Decode a cursor produced by encode_cursor into (solicitacao, cd_os)"""
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        solicitacao, cd_os = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise QueryError("Cursor inválido")
+    if not (solicitacao is None or isinstance(solicitacao, str)) or cd_os is None:
+        raise QueryError("Cursor inválido")
+    if solicitacao is None:
+        # Order without a request date: MySQL sorts it first ascending, last descending
+        return None, cd_os
+    # Cursors carry ISO dates; MySQL compares them as DATETIME literals
+    return solicitacao.replace('T', ' '), cd_os
+
+def select_clause(fields):
+    """SELECT list for the requested fields (cursor columns are always included)"""
+    selected = list(fields) + [f for f in CURSOR_FIELDS if f not in fields]
+    return ',\n            '.join(f"{SERVICE_ORDER_FIELDS[f]} as {f}" for f in selected)
+
+def parse_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'sim', 'yes')
+
+def parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"Parâmetro {name} inválido")
+
+def parse_filters(args):
+    """Build a filter dict from request args (status, technician, from, to, today, unassigned, exclude_supplies)"""
+    filters = {}
+    if args.get('status'):
+        filters['status'] = args['status']
+    if args.get('technician') and args['technician'] != 'TODOS':
+        filters['technician'] = args['technician']
+    if args.get('from'):
+        filters['date_from'] = parse_datetime(args['from'], 'from').isoformat(sep=' ')
+    if args.get('to'):
+        date_to = parse_datetime(args['to'], 'to')
+        # A bare date means "up to the end of that day"
+        if len(args['to']) <= 10:
+            date_to += timedelta(days=1)
+        filters['date_to'] = date_to.isoformat(sep=' ')
+    for flag in ('today', 'unassigned', 'exclude_supplies'):
+        if parse_bool(args.get(flag, '')):
+            filters[flag] = True
+    return filters
+
+# Response formats: ndjson is always streamed, columns sends the field names once
+RESPONSE_FORMATS = ('json', 'ndjson', 'columns')
+
+def parse_format(value):
+    output_format = (value or 'json').lower()
+    if output_format not in RESPONSE_FORMATS:
+        raise QueryError("Parâmetro format inválido")
+    return output_format
+
+def parse_order(value):
+    order = (value or 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise QueryError("Parâmetro order inválido")
+    return order
+
+def filter_key(filters):
+    """Hashable representation of a filter dict, for cache keys and ETags"""
+    return tuple(sorted(filters.items()))
+
+def where_clause(filters):
+    """WHERE conditions and parameters for a filter dict built by parse_filters"""
+    conditions = []
+    params = []
+    if 'status' in filters:
+        conditions.append("tr.sit = %s")
+        params.append(filters['status'])
+    if 'technician' in filters:
+        conditions.append("tr.atend_dia = %s")
+        params.append(filters['technician'])
+    if filters.get('unassigned'):
+        conditions.append("(tr.atend_dia IS NULL OR tr.atend_dia = '')")
+    if 'date_from' in filters:
+        conditions.append("tr.solicitacao >= %s")
+        params.append(filters['date_from'])
+    if 'date_to' in filters:
+        conditions.append("tr.solicitacao < %s")
+        params.append(filters['date_to'])
+    if filters.get('today'):
+        # Half-open range keeps the predicate sargable on the solicitacao index
+        conditions.append("tr.solicitacao >= CURDATE()")
+        conditions.append("tr.solicitacao < CURDATE() + INTERVAL 1 DAY")
+    if filters.get('exclude_supplies'):
+        # Classified at ingest time by painel_acma (see classification.py)
+        conditions.append("tr.fl_suprimento = 0")
+    conditions.append("""EXISTS (
+            SELECT 1
+            FROM tb_manu_compara mc
+            WHERE mc.cd_os_manu_compara = tr.cd_os
+        )""")
+    return conditions, params
+
+def keyset_condition(cursor, order):
+    """Rows after `cursor` in ORDER BY solicitacao, cd_os, where NULL dates sort first ascending"""
+    solicitacao, cd_os = cursor
+    op = '<' if order == 'desc' else '>'
+    if solicitacao is None:
+        if order == 'desc':
+            return f"(tr.solicitacao IS NULL AND tr.cd_os {op} %s)", [cd_os]
+        return f"(tr.solicitacao IS NOT NULL OR tr.cd_os {op} %s)", [cd_os]
+    condition = f"(tr.solicitacao {op} %s OR (tr.solicitacao = %s AND tr.cd_os {op} %s)"
+    if order == 'desc':
+        condition += " OR tr.solicitacao IS NULL"
+    return condition + ")", [solicitacao, solicitacao, cd_os]
+
+def build_service_orders_query(filters, fields=None, order='desc', limit=None, cursor=None):
+    """One parameterized query for any combination of filters, keyset paginated on (solicitacao, cd_os)"""
+    fields = fields or tuple(SERVICE_ORDER_FIELDS)
+    conditions, params = where_clause(filters)
+    if cursor is not None:
+        condition, cursor_params = keyset_condition(cursor, order)
+        conditions.append(condition)
+        params.extend(cursor_params)
+
+    direction = order.upper()
+    where = '\n        AND '.join(conditions)
+    query = f"""
+        SELECT
+            {select_clause(fields)}
+        FROM tb_top_rank tr
+        WHERE {where}
+        ORDER BY tr.solicitacao {direction}, tr.cd_os {direction}
+    """
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        query += "    LIMIT %s\n"
+        params.append(limit + 1)
+    return query, tuple(params)
+
+def build_count_query(filters):
+    """COUNT(*) of the orders matching `filters`, with the WHERE clause of the list query"""
+    conditions, params = where_clause(filters)
+    where = '\n        AND '.join(conditions)
+    query = f"""
+        SELECT COUNT(*) as total
+        FROM tb_top_rank tr
+        WHERE {where}
+    """
+    return query, tuple(params)
+
+def build_snapshot_query():
+    """Every open order with all fields plus its supply flag, for the in-memory snapshot"""
+    conditions, params = where_clause({})
+    where = '\n        AND '.join(conditions)
+    query = f"""
+        SELECT
+            {select_clause(tuple(SERVICE_ORDER_FIELDS))},
+            tr.fl_suprimento as fl_suprimento
+        FROM tb_top_rank tr
+        WHERE {where}
+    """
+    return query, tuple(params)
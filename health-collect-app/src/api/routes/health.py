@@ -0,0 +1,55 @@
+
+from flask import jsonify, Blueprint, Response
+from src.api.cache import get_cache_stats
+from src.api.changes import stream_slots
+from src.api.database import get_pool_stats, get_stream_stats
+from src.api.metrics import render_metrics
+from src.api.snapshot import open_orders
+
+# Create a Blueprint for operational/health routes
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/api/health', methods=['GET'])
+def get_health():
+    return jsonify({
+        "status": "ok",
+        "pool": get_pool_stats(),
+        "cache": get_cache_stats(),
+        "snapshot": open_orders.stats(),
+        "streams": stream_slots.stats(),
+        "query_streams": get_stream_stats()
+    })
+
+@health_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, query, cache and pool metrics"""
+    cache_stats = get_cache_stats()
+    pool_stats = get_pool_stats()
+    snapshot_stats = open_orders.stats()
+    stream_stats = stream_slots.stats()
+    query_stream_stats = get_stream_stats()
+    lookups = cache_stats['hits'] + cache_stats['misses']
+    gauges = [
+        ('api_cache_hits_total', 'Result cache hits', 'counter', cache_stats['hits']),
+        ('api_cache_misses_total', 'Result cache misses', 'counter', cache_stats['misses']),
+        ('api_cache_hit_ratio', 'Result cache hits over lookups', 'gauge',
+         round(cache_stats['hits'] / lookups, 4) if lookups else 0),
+        ('api_cache_evictions_total', 'Result cache evictions', 'counter', cache_stats['evictions']),
+        ('api_cache_invalidations_total', 'Result cache invalidations', 'counter', cache_stats['invalidations']),
+        ('api_cache_entries', 'Entries in the result cache', 'gauge', cache_stats['entries']),
+        ('api_pool_in_use', 'Checked out connections', 'gauge', pool_stats['in_use']),
+        ('api_pool_idle', 'Idle connections', 'gauge', pool_stats['idle']),
+        ('api_pool_checkouts_total', 'Connection checkouts', 'counter', pool_stats['checkouts']),
+        ('api_pool_timeouts_total', 'Checkouts that timed out', 'counter', pool_stats['timeouts']),
+        ('api_pool_wait_seconds_total', 'Time spent waiting for a connection', 'counter', pool_stats['wait_time']),
+        ('api_snapshot_orders', 'Open orders held in memory', 'gauge', snapshot_stats['orders']),
+        ('api_snapshot_loads_total', 'Snapshot reloads after a data version change', 'counter', snapshot_stats['loads']),
+        ('api_snapshot_hits_total', 'List requests answered from the snapshot', 'counter', snapshot_stats['hits']),
+        ('api_streams_active', 'Open change streams in this process', 'gauge', stream_stats['active']),
+        ('api_streams_limit', 'Concurrent change streams allowed per process', 'gauge', stream_stats['limit']),
+        ('api_streams_rejected_total', 'Change streams refused with 503', 'counter', stream_stats['rejected']),
+        ('api_query_streams_active', 'Connections held by streamed list responses', 'gauge', query_stream_stats['active']),
+        ('api_query_streams_rejected_total', 'Streamed list responses refused with 503', 'counter',
+         query_stream_stats['rejected'])
+    ]
+    return Response(render_metrics(gauges), mimetype='text/plain; version=0.0.4')
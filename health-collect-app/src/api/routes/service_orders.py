@@ -1,351 +1,319 @@
 
-from flask import jsonify, Blueprint
-from src.api.database import execute_query
-from src.api.utils import format_date
+import time
+from functools import partial
+from flask import jsonify, Blueprint, Response, current_app, request, stream_with_context, url_for
+from src.api.cache import cached, data_version
+from src.api.changes import STREAM_HEARTBEAT, STREAM_POLL_INTERVAL, ChangeFeed, format_event, stream_slots
+from src.api.database import StreamLimitReached, execute_query, stream_query
+from src.api.metrics import timed_serialization
+from src.api.snapshot import open_orders
+from src.api.stats import build_stats_query, summarize_stats
+from src.api.queries import (
+    CURSOR_FIELDS, DEFAULT_PAGE_SIZE, ROUTE_FILTERS, SERVICE_ORDER_FIELDS, QueryError,
+    build_service_orders_query, decode_cursor, encode_cursor, filter_key,
+    parse_bool, parse_fields, parse_filters, parse_format, parse_limit, parse_order
+)
+from src.api.utils import make_etag, is_not_modified, not_modified_response, set_validators
 
 # Create a Blueprint for service orders routes
 service_orders_bp = Blueprint('service_orders', __name__)
 
-@service_orders_bp.route('/api/service-orders', methods=['GET'])
-def get_service_orders():
-    query = """
-        SELECT 
-            id_top_rank,
-            cd_os,
-            solicitacao,
-            previsao,
-            servico_sol,
-            setor_sol,
-            solicitante,
-            sit,
-            TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-            atend_dia,
-            CASE 
-                WHEN sit = 'Concluída' THEN 'Concluída'
-                ELSE 'Pendente'
-            END as status,
-            servico_sol as descricao,
-            timestamp
-        FROM tb_top_rank tr
-        WHERE EXISTS (
-            SELECT 1
-            FROM tb_manu_compara mc
-            WHERE mc.cd_os_manu_compara = tr.cd_os
-        )
-        ORDER BY solicitacao DESC
+def paginate(service_orders, fields=None, limit=None):
+    """(rows, next_cursor) from the rows of a list query fetched with LIMIT limit+1"""
+    next_cursor = None
+    if limit is not None and len(service_orders) > limit:
+        service_orders = service_orders[:limit]
+        next_cursor = encode_cursor(service_orders[-1])
+
+    if fields is not None:
+        extra = [f for f in CURSOR_FIELDS if f not in fields]
+        if extra:
+            service_orders = [{f: order[f] for f in fields} for order in service_orders]
+    return service_orders, next_cursor
+
+def fetch_service_orders(cache_key, query, params=None, fields=None, limit=None):
+    """Run a service-order query, cached per data version
+
+    Returns ((rows, next_cursor), error); next_cursor is only set for paginated queries.
     """
-    
-    service_orders, error = execute_query(query)
+    def compute():
+        # Dates come formatted from SQL, rows are encoded as fetched
+        service_orders, error = execute_query(query, params)
+        if error:
+            return None, error
+        return paginate(service_orders, fields, limit), None
+
+    return cached(cache_key, compute)
+
+def fetch_open_orders(filters, order='desc', fields=None, limit=None, cursor=None):
+    """Same contract as fetch_service_orders, answered from the in-memory snapshot"""
+    rows, error = open_orders.select(filters, order, limit + 1 if limit is not None else None, cursor)
+    if error:
+        return None, error
+    rows, next_cursor = paginate(rows, None, limit)
+    if fields is not None and fields != tuple(SERVICE_ORDER_FIELDS):
+        rows = [{f: row[f] for f in fields} for row in rows]
+    return (rows, next_cursor), None
+
+def service_orders_response(page, fields=None, output_format='json'):
+    """JSON response for a (rows, next_cursor) page, with the pagination headers"""
+    service_orders, next_cursor = page
+    with timed_serialization():
+        if output_format == 'columns':
+            # Compact form: field names once, then one array of values per order
+            columns = list(fields or SERVICE_ORDER_FIELDS)
+            response = jsonify({
+                "columns": columns,
+                "rows": [[order[c] for c in columns] for order in service_orders]
+            })
+        else:
+            response = jsonify(service_orders)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{next_page_url(next_cursor)}>; rel="next"'
+    return response
+
+def respond_service_orders(cache_key, fetch, fields=None, output_format='json'):
+    """JSON response for the page returned by `fetch`, answering conditional GETs with 304"""
+    version = data_version.current()
+    etag = make_etag(cache_key, output_format, version) if version is not None else None
+    last_modified = data_version.last_modified
+    if etag and is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    page, error = fetch()
     if error:
         return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+
+    response = service_orders_response(page, fields, output_format)
+    if etag:
+        set_validators(response, etag, last_modified)
+    return response
+
+def respond_streaming(cache_key, query, params, fields, output_format):
+    """Stream rows straight from the cursor as a JSON array or NDJSON, bypassing the cache"""
+    version = data_version.current()
+    etag = make_etag(cache_key, output_format, version) if version is not None else None
+    last_modified = data_version.last_modified
+    if etag and is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    batches = stream_query(query, params)
+    try:
+        # Run the query before answering so failures still produce a 500
+        first = next(batches, [])
+    except StreamLimitReached as e:
+        print(f"Streaming recusado: {str(e)}")
+        response = jsonify({"error": "Limite de exportações simultâneas atingido"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    except Exception as e:
+        print(f"Erro ao executar query: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    project = fields is not None and any(f not in fields for f in CURSOR_FIELDS)
+    ndjson = output_format == 'ndjson'
+
+    def generate():
+        dumps = partial(current_app.json.dumps, separators=(',', ':'))
+        yield '' if ndjson else '['
+        separator = ''
+        batch = first
+        try:
+            while batch:
+                if project:
+                    batch = [{f: order[f] for f in fields} for order in batch]
+                if ndjson:
+                    yield ''.join(dumps(order) + '\n' for order in batch)
+                else:
+                    yield separator + ','.join(dumps(order) for order in batch)
+                    separator = ','
+                batch = next(batches, None)
+        except Exception as e:
+            # Status is already sent; the client sees a truncated body
+            print(f"Erro durante o streaming: {str(e)}")
+            return
+        finally:
+            batches.close()
+        if not ndjson:
+            yield ']'
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if ndjson else 'application/json'
+    )
+    # Returns the connection even if the body is never iterated
+    response.call_on_close(batches.close)
+    if etag:
+        set_validators(response, etag, last_modified)
+    return response
+
+def next_page_url(cursor):
+    # Merged into one dict: a query arg named like a path variable (?status= on
+    # /status/<status>) must not be passed to url_for twice; the path wins
+    return url_for(request.endpoint, **{**request.args.to_dict(), **request.view_args, 'cursor': cursor})
+
+def query_service_orders(filters, order='desc'):
+    """Respond with the orders matching `filters`, honouring the fields/limit/cursor/format args"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+        cursor_arg = request.args.get('cursor')
+        cursor = decode_cursor(cursor_arg) if cursor_arg else None
+        output_format = parse_format(request.args.get('format'))
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    streaming = output_format == 'ndjson' or parse_bool(request.args.get('stream', ''))
+    if streaming and output_format == 'columns':
+        return jsonify({"error": "format=columns não suporta streaming"}), 400
+    if streaming:
+        # Streaming covers everything after the cursor; limit does not apply
+        query, params = build_service_orders_query(filters, fields, order, None, cursor)
+        cache_key = ('stream', filter_key(filters), order, fields, cursor_arg)
+        return respond_streaming(cache_key, query, params, fields, output_format)
+
+    if cursor is not None and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+
+    cache_key = ('query', filter_key(filters), order, fields, limit, cursor_arg)
+    if open_orders.answers(filters):
+        # The open set is in memory; only date-range (history) queries need MySQL
+        fetch = partial(fetch_open_orders, filters, order, fields, limit, cursor)
+    else:
+        query, params = build_service_orders_query(filters, fields, order, limit, cursor)
+        fetch = partial(fetch_service_orders, cache_key, query, params, fields, limit)
+    return respond_service_orders(cache_key, fetch, fields, output_format)
+
+@service_orders_bp.route('/api/service-orders', methods=['GET'])
+def get_service_orders():
+    return query_service_orders(*ROUTE_FILTERS['all'])
+
+@service_orders_bp.route('/api/service-orders/query', methods=['GET'])
+def get_service_orders_query():
+    try:
+        filters = parse_filters(request.args)
+        order = parse_order(request.args.get('order'))
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return query_service_orders(filters, order)
 
 @service_orders_bp.route('/api/service-orders/technician/<technician>', methods=['GET'])
 def get_service_orders_by_technician(technician):
     if technician == 'TODOS':
-        query = """
-            SELECT 
-                id_top_rank,
-                cd_os,
-                solicitacao,
-                previsao,
-                servico_sol,
-                setor_sol,
-                solicitante,
-                sit,
-                TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-                atend_dia,
-                CASE 
-                    WHEN sit = 'Concluída' THEN 'Concluída'
-                    ELSE 'Pendente'
-                END as status,
-                servico_sol as descricao,
-                timestamp
-            FROM tb_top_rank tr
-            WHERE EXISTS (
-                SELECT 1
-                FROM tb_manu_compara mc
-                WHERE mc.cd_os_manu_compara = tr.cd_os
-            )
-            ORDER BY solicitacao DESC
-        """
-        service_orders, error = execute_query(query)
-    else:
-        query = """
-            SELECT 
-                id_top_rank,
-                cd_os,
-                solicitacao,
-                previsao,
-                servico_sol,
-                setor_sol,
-                solicitante,
-                sit,
-                TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-                atend_dia,
-                CASE 
-                    WHEN sit = 'Concluída' THEN 'Concluída'
-                    ELSE 'Pendente'
-                END as status,
-                servico_sol as descricao,
-                timestamp
-            FROM tb_top_rank tr
-            WHERE atend_dia = %s
-            AND EXISTS (
-                SELECT 1
-                FROM tb_manu_compara mc
-                WHERE mc.cd_os_manu_compara = tr.cd_os
-            )
-            ORDER BY solicitacao DESC
-        """
-        service_orders, error = execute_query(query, (technician,))
-    
-    if error:
-        return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+        return query_service_orders(*ROUTE_FILTERS['all'])
+    return query_service_orders({'technician': technician})
 
 @service_orders_bp.route('/api/service-orders/status/<status>', methods=['GET'])
 def get_service_orders_by_status(status):
-    query = """
-        SELECT 
-            id_top_rank,
-            cd_os,
-            solicitacao,
-            previsao,
-            servico_sol,
-            setor_sol,
-            solicitante,
-            sit,
-            TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-            atend_dia,
-            CASE 
-                WHEN sit = 'Concluída' THEN 'Concluída'
-                ELSE 'Pendente'
-            END as status,
-            servico_sol as descricao,
-            timestamp
-        FROM tb_top_rank tr
-        WHERE sit = %s
-        AND EXISTS (
-            SELECT 1
-            FROM tb_manu_compara mc
-            WHERE mc.cd_os_manu_compara = tr.cd_os
-        )
-        ORDER BY solicitacao DESC
-    """
-    
-    service_orders, error = execute_query(query, (status,))
-    if error:
-        return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+    return query_service_orders({'status': status})
 
 @service_orders_bp.route('/api/service-orders/new', methods=['GET'])
 def get_new_service_orders():
-    query = """
-        SELECT 
-            id_top_rank,
-            cd_os,
-            solicitacao,
-            previsao,
-            servico_sol,
-            setor_sol,
-            solicitante,
-            sit,
-            TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-            atend_dia,
-            CASE 
-                WHEN sit = 'Concluída' THEN 'Concluída'
-                ELSE 'Pendente'
-            END as status,
-            servico_sol as descricao,
-            timestamp
-        FROM tb_top_rank tr
-        WHERE atend_dia = ''
-        AND LOWER(servico_sol) NOT LIKE '%toner%'
-        AND LOWER(servico_sol) NOT LIKE '%tuner%'
-        AND LOWER(servico_sol) NOT LIKE '%tunner%'
-        AND LOWER(servico_sol) NOT LIKE '%tonner%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNE%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNE%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CATUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUXO%'
-        AND LOWER(servico_sol) NOT LIKE '%colorida%'
-        AND LOWER(servico_sol) NOT LIKE '%coloridas%'
-        AND LOWER(servico_sol) NOT LIKE '%impressão color%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISÃO%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISAO%'
-        AND LOWER(servico_sol) NOT LIKE '%camera%'
-        AND LOWER(servico_sol) NOT LIKE '%cameras%'
-        AND LOWER(servico_sol) NOT LIKE '%TV%'
-        AND LOWER(servico_sol) NOT LIKE '%TVS%'
-        AND DATE_FORMAT(solicitacao, '%Y-%m-%d') = CURDATE()
-        AND EXISTS (
-            SELECT 1
-            FROM tb_manu_compara mc
-            WHERE mc.cd_os_manu_compara = tr.cd_os
-        )
-        ORDER BY solicitacao ASC
-    """
-    
-    service_orders, error = execute_query(query)
-    if error:
-        return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+    return query_service_orders(*ROUTE_FILTERS['new'])
 
 @service_orders_bp.route('/api/service-orders/today', methods=['GET'])
 def get_today_service_orders():
-    query = """
-        SELECT 
-            id_top_rank,
-            cd_os,
-            solicitacao,
-            previsao,
-            servico_sol,
-            setor_sol,
-            solicitante,
-            sit,
-            TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-            atend_dia,
-            CASE 
-                WHEN sit = 'Concluída' THEN 'Concluída'
-                ELSE 'Pendente'
-            END as status,
-            servico_sol as descricao,
-            timestamp
-        FROM tb_top_rank tr
-        WHERE DATE_FORMAT(solicitacao, '%Y-%m-%d') = CURDATE()
-        AND LOWER(servico_sol) NOT LIKE '%toner%'
-        AND LOWER(servico_sol) NOT LIKE '%tuner%'
-        AND LOWER(servico_sol) NOT LIKE '%tunner%'
-        AND LOWER(servico_sol) NOT LIKE '%tonner%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNE%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNE%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CATUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUXO%'
-        AND LOWER(servico_sol) NOT LIKE '%colorida%'
-        AND LOWER(servico_sol) NOT LIKE '%coloridas%'
-        AND LOWER(servico_sol) NOT LIKE '%impressão color%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISÃO%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISAO%'
-        AND LOWER(servico_sol) NOT LIKE '%camera%'
-        AND LOWER(servico_sol) NOT LIKE '%cameras%'
-        AND LOWER(servico_sol) NOT LIKE '%TV%'
-        AND LOWER(servico_sol) NOT LIKE '%TVS%'
-        AND EXISTS (
-            SELECT 1
-            FROM tb_manu_compara mc
-            WHERE mc.cd_os_manu_compara = tr.cd_os
-        )
-        ORDER BY solicitacao ASC
-    """
-    
-    service_orders, error = execute_query(query)
-    if error:
-        return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+    return query_service_orders(*ROUTE_FILTERS['today'])
 
 @service_orders_bp.route('/api/service-orders/pending', methods=['GET'])
 def get_pending_service_orders():
-    query = """
-        SELECT 
-            id_top_rank,
-            cd_os,
-            solicitacao,
-            previsao,
-            servico_sol,
-            setor_sol,
-            solicitante,
-            sit,
-            TIMESTAMPDIFF(DAY, solicitacao, NOW()) as dias,
-            atend_dia,
-            CASE 
-                WHEN sit = 'Concluída' THEN 'Concluída'
-                ELSE 'Pendente'
-            END as status,
-            servico_sol as descricao,
-            timestamp
-        FROM tb_top_rank tr
-        WHERE (atend_dia IS NULL OR atend_dia = '')
-        AND LOWER(servico_sol) NOT LIKE '%toner%'
-        AND LOWER(servico_sol) NOT LIKE '%tuner%'
-        AND LOWER(servico_sol) NOT LIKE '%tunner%'
-        AND LOWER(servico_sol) NOT LIKE '%tonner%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNE%'
-        AND LOWER(servico_sol) NOT LIKE '%TOWNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNER%'
-        AND LOWER(servico_sol) NOT LIKE '%TORNE%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CATUCHO%'
-        AND LOWER(servico_sol) NOT LIKE '%CARTUXO%'
-        AND LOWER(servico_sol) NOT LIKE '%colorida%'
-        AND LOWER(servico_sol) NOT LIKE '%coloridas%'
-        AND LOWER(servico_sol) NOT LIKE '%impressão color%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISÃO%'
-        AND LOWER(servico_sol) NOT LIKE '%TELEVISAO%'
-        AND LOWER(servico_sol) NOT LIKE '%camera%'
-        AND LOWER(servico_sol) NOT LIKE '%cameras%'
-        AND LOWER(servico_sol) NOT LIKE '%TV%'
-        AND LOWER(servico_sol) NOT LIKE '%TVS%'
-        AND EXISTS (
-            SELECT 1
-            FROM tb_manu_compara mc
-            WHERE mc.cd_os_manu_compara = tr.cd_os
-        )
-        ORDER BY solicitacao ASC
-    """
-    
-    service_orders, error = execute_query(query)
+    return query_service_orders(*ROUTE_FILTERS['pending'])
+
+@service_orders_bp.route('/api/service-orders/stats', methods=['GET'])
+def get_service_orders_stats():
+    """Counts of the open orders per technician, status, sector and aging bucket"""
+    try:
+        filters = parse_filters(request.args)
+        query, params = build_stats_query(filters)
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cache_key = ('stats', filter_key(filters))
+    version = data_version.current()
+    etag = make_etag(cache_key, version) if version is not None else None
+    last_modified = data_version.last_modified
+    if etag and is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    def compute():
+        rows, error = execute_query(query, params)
+        if error:
+            return None, error
+        return summarize_stats(rows), None
+
+    stats, error = cached(cache_key, compute)
     if error:
         return jsonify({"error": error}), 500
-    
-    # Format dates for JSON response
-    for order in service_orders:
-        order['solicitacao'] = format_date(order['solicitacao'])
-        order['previsao'] = format_date(order['previsao'])
-        order['timestamp'] = format_date(order['timestamp'])
-    
-    return jsonify(service_orders)
+    response = jsonify(stats)
+    if etag:
+        set_validators(response, etag, last_modified)
+    return response
+
+def load_open_orders():
+    """Every order of the current snapshot, from memory or the cache entry of /api/service-orders"""
+    filters, order = ROUTE_FILTERS['all']
+    fields = tuple(SERVICE_ORDER_FIELDS)
+    if open_orders.answers(filters):
+        page, error = fetch_open_orders(filters, order, fields)
+        return (page[0] if page else None), error
+    query, params = build_service_orders_query(filters, fields, order)
+    page, error = fetch_service_orders(('query', filter_key(filters), order, fields, None, None), query, params, fields)
+    return (page[0] if page else None), error
+
+change_feed = ChangeFeed(load_open_orders)
+
+@service_orders_bp.route('/api/service-orders/stream', methods=['GET'])
+def stream_service_orders():
+    """Server-Sent Events: a snapshot on connect, then inserted/updated/removed deltas"""
+    release = stream_slots.acquire()
+    if release is None:
+        # EventSource does not retry a 503: the client falls back to polling the list routes
+        response = jsonify({"error": "Limite de streams simultâneos atingido"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(STREAM_HEARTBEAT))
+        return response
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+
+    def generate():
+        yield f"retry: {int(STREAM_POLL_INTERVAL * 1000)}\n\n"
+        seq = change_feed.parse_token(last_event_id)
+        events = change_feed.events_since(seq) if seq is not None else None
+        last_sent = time.monotonic()
+        while True:
+            if events is None:
+                # New client, restarted server or events already dropped: resend the full state
+                state = change_feed.snapshot()
+                if state is None:
+                    # Database unavailable: keep the connection and retry, never send an empty snapshot
+                    if time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+                        yield ": ping\n\n"
+                        last_sent = time.monotonic()
+                    time.sleep(STREAM_POLL_INTERVAL)
+                    continue
+                seq, rows = state
+                yield format_event('snapshot', change_feed.token(seq), {'rows': rows})
+                events = []
+                last_sent = time.monotonic()
+
+            for event_seq, data in events:
+                yield format_event('change', change_feed.token(event_seq), data)
+                seq = event_seq
+                last_sent = time.monotonic()
+
+            if time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+                yield ": ping\n\n"
+                last_sent = time.monotonic()
+
+            change_feed.wait(seq, STREAM_POLL_INTERVAL)
+            change_feed.poll()
+            events = change_feed.events_since(seq)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(release)
+    return response
@@ -0,0 +1,137 @@
+
+from flask import jsonify, Blueprint, request
+from src.api.async_database import gather_queries
+from src.api.cache import _MISSING, cache, data_version
+from src.api.queries import (
+    DEFAULT_PAGE_SIZE, ROUTE_FILTERS, QueryError, build_count_query, build_service_orders_query,
+    decode_cursor, filter_key, parse_bool, parse_fields, parse_filters, parse_format, parse_limit, parse_order
+)
+from src.api.routes.service_orders import paginate, service_orders_response
+from src.api.utils import make_etag, is_not_modified, not_modified_response, set_validators
+
+# Async variants of the service-order routes (registered only when aiomysql and
+# flask[async] are installed). Independent queries of a request run concurrently
+# on the async pool instead of one after the other.
+service_orders_async_bp = Blueprint('service_orders_async', __name__, url_prefix='/api/async')
+
+async def cached_queries(version, entries):
+    """Resolve {cache_key: (query, params, transform)} from the cache, running the misses concurrently
+
+    Returns ({cache_key: value}, error). Unlike cached(), concurrent misses are not coalesced.
+    """
+    values = {}
+    missing = []
+    for key in entries:
+        value = cache.get(key, version) if version is not None else _MISSING
+        if value is _MISSING:
+            missing.append(key)
+        else:
+            values[key] = value
+
+    results = await gather_queries(*((entries[key][0], entries[key][1]) for key in missing))
+    for key, (result, error) in zip(missing, results):
+        if error:
+            return None, error
+        value = entries[key][2](result)
+        if version is not None:
+            cache.set(key, version, value)
+        values[key] = value
+    return values, None
+
+async def query_service_orders_async(filters, order='desc'):
+    """Same contract as query_service_orders, plus X-Total-Count computed alongside the list"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+        cursor_arg = request.args.get('cursor')
+        cursor = decode_cursor(cursor_arg) if cursor_arg else None
+        output_format = parse_format(request.args.get('format'))
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    if output_format == 'ndjson' or parse_bool(request.args.get('stream', '')):
+        return jsonify({"error": "streaming não é suportado nas rotas assíncronas"}), 400
+
+    if cursor is not None and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+
+    version = data_version.current()
+    list_key = ('query', filter_key(filters), order, fields, limit, cursor_arg)
+    count_key = ('count', filter_key(filters))
+    etag = make_etag(list_key, output_format, 'count', version) if version is not None else None
+    last_modified = data_version.last_modified
+    if etag and is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    list_query, list_params = build_service_orders_query(filters, fields, order, limit, cursor)
+    count_query, count_params = build_count_query(filters)
+    values, error = await cached_queries(version, {
+        # Same key as the sync routes, so both share the cached pages
+        list_key: (list_query, list_params, lambda rows: paginate(rows, fields, limit)),
+        count_key: (count_query, count_params, lambda rows: rows[0]['total'])
+    })
+    if error:
+        return jsonify({"error": error}), 500
+
+    response = service_orders_response(values[list_key], fields, output_format)
+    response.headers['X-Total-Count'] = str(values[count_key])
+    if etag:
+        set_validators(response, etag, last_modified)
+    return response
+
+@service_orders_async_bp.route('/service-orders', methods=['GET'])
+async def get_service_orders():
+    return await query_service_orders_async(*ROUTE_FILTERS['all'])
+
+@service_orders_async_bp.route('/service-orders/query', methods=['GET'])
+async def get_service_orders_query():
+    try:
+        filters = parse_filters(request.args)
+        order = parse_order(request.args.get('order'))
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return await query_service_orders_async(filters, order)
+
+@service_orders_async_bp.route('/service-orders/technician/<technician>', methods=['GET'])
+async def get_service_orders_by_technician(technician):
+    if technician == 'TODOS':
+        return await query_service_orders_async(*ROUTE_FILTERS['all'])
+    return await query_service_orders_async({'technician': technician})
+
+@service_orders_async_bp.route('/service-orders/status/<status>', methods=['GET'])
+async def get_service_orders_by_status(status):
+    return await query_service_orders_async({'status': status})
+
+@service_orders_async_bp.route('/service-orders/new', methods=['GET'])
+async def get_new_service_orders():
+    return await query_service_orders_async(*ROUTE_FILTERS['new'])
+
+@service_orders_async_bp.route('/service-orders/today', methods=['GET'])
+async def get_today_service_orders():
+    return await query_service_orders_async(*ROUTE_FILTERS['today'])
+
+@service_orders_async_bp.route('/service-orders/pending', methods=['GET'])
+async def get_pending_service_orders():
+    return await query_service_orders_async(*ROUTE_FILTERS['pending'])
+
+@service_orders_async_bp.route('/service-orders/overview', methods=['GET'])
+async def get_service_orders_overview():
+    """Counts of every dashboard list (all/new/today/pending), queried concurrently"""
+    version = data_version.current()
+    etag = make_etag('overview', version) if version is not None else None
+    last_modified = data_version.last_modified
+    if etag and is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    entries = {}
+    for filters, _ in ROUTE_FILTERS.values():
+        query, params = build_count_query(filters)
+        entries[('count', filter_key(filters))] = (query, params, lambda rows: rows[0]['total'])
+    values, error = await cached_queries(version, entries)
+    if error:
+        return jsonify({"error": error}), 500
+
+    response = jsonify({route: values[('count', filter_key(filters))]
+                        for route, (filters, _) in ROUTE_FILTERS.items()})
+    if etag:
+        set_validators(response, etag, last_modified)
+    return response
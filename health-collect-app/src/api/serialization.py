@@ -0,0 +1,33 @@
+
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+# Date columns are formatted by MySQL (see queries.SERVICE_ORDER_FIELDS), so
+# service-order rows hold only str/int/None and encode without a Python pass.
+# Both placeholders avoid "%s", which mysql.connector reserves for parameters.
+ISO_DATETIME_SQL = "'%Y-%m-%dT%T'"
+PANEL_DATETIME_SQL = "'%d/%m/%y %H:%i'"
+
+def iso_datetime_sql(column):
+    """SQL expression rendering a DATETIME column as an ISO 8601 string"""
+    return f"DATE_FORMAT({column}, {ISO_DATETIME_SQL})"
+
+def iso_text_datetime_sql(column):
+    """Like iso_datetime_sql, for columns that may hold panel text (DD/MM/YY HH:MM)"""
+    return f"DATE_FORMAT(COALESCE(STR_TO_DATE({column}, {PANEL_DATETIME_SQL}), {column}), {ISO_DATETIME_SQL})"
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    return DefaultJSONProvider.default(o)
+
+class ServiceOrderJSONProvider(DefaultJSONProvider):
+    """JSON provider for the API: compact, insertion-ordered, native handling of dates/decimals"""
+
+    default = staticmethod(_default)
+    sort_keys = False
+    ensure_ascii = False
+    compact = True
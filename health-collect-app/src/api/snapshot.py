@@ -0,0 +1,188 @@
+
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from src.api.cache import cached, data_version
+from src.api.database import execute_query
+from src.api.queries import build_snapshot_query
+
+# The open orders (those in tb_manu_compara) are a few hundred rows, so the API
+# keeps them in memory and answers the list filters without a round trip.
+SNAPSHOT_ENABLED = os.environ.get('API_SNAPSHOT', '1') not in ('0', 'false', 'no')
+
+# Filters of parse_filters the snapshot can answer; date ranges go to SQL
+SNAPSHOT_FILTERS = ('status', 'technician', 'unassigned', 'today', 'exclude_supplies')
+
+SNAPSHOT_CACHE_KEY = ('snapshot',)
+
+def collation_key(value):
+    """Comparison key equivalent to MySQL's accent- and case-insensitive PAD SPACE collation
+
+    `tr.atend_dia = %s` matches "kaua, sara " to "KAUÁ, SARA", so the in-memory
+    indexes and filters compare through this key instead of exact equality.
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().rstrip(' ')
+
+class OpenOrder:
+    """One open order: the response row plus the columns the filters look at"""
+
+    __slots__ = ('row', 'key', 'atend_dia', 'sit', 'dia', 'supply')
+
+    def __init__(self, row, supply):
+        self.row = row
+        # Sort key of the keyset cursor; MySQL puts NULL dates first in ascending order
+        self.key = (row['solicitacao'] or '', row['cd_os'])
+        self.atend_dia = collation_key(row['atend_dia'])
+        self.sit = collation_key(row['sit'])
+        self.dia = (row['solicitacao'] or '')[:10]
+        self.supply = bool(supply)
+
+class Snapshot:
+    """Immutable set of open orders sorted by (solicitacao, cd_os), with secondary indexes
+
+    Each index maps a value to the ascending positions of its orders, so a
+    filtered list is a walk over the smallest matching index.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        # The data version ends with the database's CURDATE(): the day "dias" and "today" refer to
+        self.today = version.rpartition(':')[2]
+        self.loaded_at = time.time()
+        orders = []
+        for row in rows:
+            # Copy: the rows may be the result cache's own objects
+            row = dict(row)
+            supply = row.pop('fl_suprimento', 0)
+            orders.append(OpenOrder(row, supply))
+        orders.sort(key=lambda order: order.key)
+        self.orders = orders
+        self.keys = [order.key for order in orders]
+        self.by_technician = {}
+        self.by_status = {}
+        self.by_day = {}
+        for position, order in enumerate(orders):
+            self.by_technician.setdefault(order.atend_dia, []).append(position)
+            self.by_status.setdefault(order.sit, []).append(position)
+            self.by_day.setdefault(order.dia, []).append(position)
+
+    def _candidates(self, filters, today):
+        """Positions from the most selective index that applies, or None for a full scan"""
+        indexes = []
+        if 'status' in filters:
+            indexes.append(self.by_status.get(collation_key(filters['status']), []))
+        if 'technician' in filters:
+            indexes.append(self.by_technician.get(collation_key(filters['technician']), []))
+        if filters.get('unassigned'):
+            indexes.append(self.by_technician.get('', []))
+        if filters.get('today'):
+            indexes.append(self.by_day.get(today, []))
+        return min(indexes, key=len) if indexes else None
+
+    def _matches(self, order, filters, today, status, technician):
+        if status is not None and order.sit != status:
+            return False
+        if technician is not None and order.atend_dia != technician:
+            return False
+        if filters.get('unassigned') and order.atend_dia:
+            return False
+        if filters.get('today') and order.dia != today:
+            return False
+        if filters.get('exclude_supplies') and order.supply:
+            return False
+        return True
+
+    def select(self, filters, order='desc', limit=None, cursor=None):
+        """Rows matching `filters` in (solicitacao, cd_os) order, after `cursor`, at most `limit`"""
+        today = self.today
+        status = collation_key(filters['status']) if 'status' in filters else None
+        technician = collation_key(filters['technician']) if 'technician' in filters else None
+        positions = self._candidates(filters, today)
+        if positions is None:
+            positions = range(len(self.orders))
+
+        if cursor is not None:
+            # Cursors carry "YYYY-MM-DD HH:MM:SS" or None (see decode_cursor); rows hold ISO dates
+            key = ((cursor[0] or '').replace(' ', 'T'), str(cursor[1]))
+            if order == 'desc':
+                positions = positions[:bisect_left(positions, bisect_left(self.keys, key))]
+            else:
+                positions = positions[bisect_left(positions, bisect_right(self.keys, key)):]
+        if order == 'desc':
+            positions = reversed(positions)
+
+        rows = []
+        for position in positions:
+            open_order = self.orders[position]
+            if self._matches(open_order, filters, today, status, technician):
+                rows.append(open_order.row)
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+def load_snapshot_rows():
+    query, params = build_snapshot_query()
+    return execute_query(query, params)
+
+class OpenOrderSnapshot:
+    """Holds the current Snapshot, replacing it atomically when the data version changes"""
+
+    def __init__(self, enabled=SNAPSHOT_ENABLED):
+        self.enabled = enabled
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def answers(self, filters):
+        """True when every filter can be evaluated in memory"""
+        return self.enabled and all(name in SNAPSHOT_FILTERS for name in filters)
+
+    def current(self):
+        """(snapshot, error) for the current data version, loading it on the first request after a change"""
+        version = data_version.current()
+        if version is None:
+            return None, "Falha na conexão com o banco de dados"
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot, None
+
+        with self._lock:
+            # Another request may have loaded it while this one waited
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot, None
+            # Through the result cache, so with the shared backend one worker queries per version
+            rows, error = cached(SNAPSHOT_CACHE_KEY, load_snapshot_rows)
+            if error:
+                return None, error
+            snapshot = Snapshot(version, rows)
+            self._snapshot = snapshot
+            self.loads += 1
+            return snapshot, None
+
+    def select(self, filters, order='desc', limit=None, cursor=None):
+        """(rows, error) for `filters` from the current snapshot; see Snapshot.select"""
+        snapshot, error = self.current()
+        if error:
+            return None, error
+        self.hits += 1
+        return snapshot.select(filters, order, limit, cursor), None
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'enabled': self.enabled,
+            'orders': len(snapshot.orders) if snapshot else 0,
+            'version': snapshot.version if snapshot else None,
+            'loaded_at': snapshot.loaded_at if snapshot else None,
+            'loads': self.loads,
+            'hits': self.hits
+        }
+
+open_orders = OpenOrderSnapshot()
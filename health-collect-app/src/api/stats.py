@@ -0,0 +1,139 @@
+
+from src.api.queries import QueryError
+
+# Summary of the open orders (those in tb_manu_compara). It is not maintained
+# incrementally: every writer of these rows (each changed snapshot of the
+# collector, reclassify_supplies) rebuilds it in full, in its own transaction.
+# The open set is a few hundred rows, so the rebuild is cheap. One row per
+# technician, status, sector, supply flag and request day; aging is derived
+# from the day at read time so it stays correct between ingests.
+CREATE_BACKLOG_STATS = """
+    CREATE TABLE IF NOT EXISTS tb_stats_backlog (
+        atend_dia VARCHAR(255) NOT NULL DEFAULT '',
+        sit VARCHAR(50) NOT NULL DEFAULT '',
+        setor_sol VARCHAR(255) NOT NULL DEFAULT '',
+        fl_suprimento TINYINT(1) NOT NULL DEFAULT 0,
+        dia DATE NULL,
+        total INT NOT NULL,
+        KEY idx_stats_backlog_dia (dia)
+    )
+"""
+
+REFRESH_BACKLOG_STATS = [
+    "DELETE FROM tb_stats_backlog",
+    """
+    INSERT INTO tb_stats_backlog (atend_dia, sit, setor_sol, fl_suprimento, dia, total)
+    SELECT
+        COALESCE(tr.atend_dia, ''),
+        COALESCE(tr.sit, ''),
+        COALESCE(tr.setor_sol, ''),
+        tr.fl_suprimento,
+        DATE(tr.solicitacao),
+        COUNT(*)
+    FROM tb_top_rank tr
+    WHERE EXISTS (
+        SELECT 1
+        FROM tb_manu_compara mc
+        WHERE mc.cd_os_manu_compara = tr.cd_os
+    )
+    GROUP BY 1, 2, 3, 4, 5
+    """
+]
+
+# Aging buckets in days since the request: (label, upper bound inclusive or None)
+AGING_BUCKETS = (
+    ('0-1', 1),
+    ('2-3', 3),
+    ('4-7', 7),
+    ('8-15', 15),
+    ('16-30', 30),
+    ('31+', None)
+)
+
+# Filters of parse_filters that the summary table can answer
+STATS_FILTERS = ('status', 'technician', 'unassigned', 'today', 'exclude_supplies')
+
+def refresh_backlog_stats(cursor):
+    """Full rebuild of tb_stats_backlog from the open orders; run inside the writer's transaction"""
+    for statement in REFRESH_BACKLOG_STATS:
+        cursor.execute(statement)
+
+def create_backlog_stats(connection):
+    """Migration step: create and fill the summary table"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(CREATE_BACKLOG_STATS)
+        refresh_backlog_stats(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+
+def aging_sql(column):
+    """CASE expression mapping a request day to its AGING_BUCKETS label"""
+    age = f"TIMESTAMPDIFF(DAY, {column}, CURDATE())"
+    cases = ' '.join(f"WHEN {age} <= {limit} THEN '{label}'" for label, limit in AGING_BUCKETS if limit is not None)
+    return f"CASE {cases} ELSE '{AGING_BUCKETS[-1][0]}' END"
+
+def build_stats_query(filters):
+    """One pass over tb_stats_backlog grouped by technician, status, sector and aging bucket"""
+    unsupported = [name for name in filters if name not in STATS_FILTERS]
+    if unsupported:
+        raise QueryError(f"Filtro não suportado nas estatísticas: {', '.join(unsupported)}")
+
+    conditions = []
+    params = []
+    if 'status' in filters:
+        conditions.append("sb.sit = %s")
+        params.append(filters['status'])
+    if 'technician' in filters:
+        conditions.append("sb.atend_dia = %s")
+        params.append(filters['technician'])
+    if filters.get('unassigned'):
+        conditions.append("sb.atend_dia = ''")
+    if filters.get('today'):
+        conditions.append("sb.dia = CURDATE()")
+    if filters.get('exclude_supplies'):
+        conditions.append("sb.fl_suprimento = 0")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    query = f"""
+        SELECT
+            sb.atend_dia as atend_dia,
+            sb.sit as sit,
+            sb.setor_sol as setor_sol,
+            {aging_sql('sb.dia')} as aging,
+            SUM(sb.total) as total
+        FROM tb_stats_backlog sb
+        {where}
+        GROUP BY 1, 2, 3, 4
+    """
+    return query, tuple(params)
+
+def _ranked(counts):
+    return [{'name': name, 'total': total}
+            for name, total in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+def summarize_stats(rows):
+    """Roll the grouped rows up into per-technician, status, sector and aging counts"""
+    total = 0
+    technicians = {}
+    statuses = {}
+    sectors = {}
+    aging = {label: 0 for label, _ in AGING_BUCKETS}
+    technician_status = {}
+    for row in rows:
+        count = int(row['total'])
+        total += count
+        technicians[row['atend_dia']] = technicians.get(row['atend_dia'], 0) + count
+        statuses[row['sit']] = statuses.get(row['sit'], 0) + count
+        sectors[row['setor_sol']] = sectors.get(row['setor_sol'], 0) + count
+        aging[row['aging']] = aging.get(row['aging'], 0) + count
+        by_status = technician_status.setdefault(row['atend_dia'], {})
+        by_status[row['sit']] = by_status.get(row['sit'], 0) + count
+    return {
+        'total': total,
+        'by_technician': [dict(entry, by_status=technician_status[entry['name']]) for entry in _ranked(technicians)],
+        'by_status': _ranked(statuses),
+        'by_sector': _ranked(sectors),
+        'aging': aging
+    }
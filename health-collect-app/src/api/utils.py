@@ -1,21 +1,30 @@
 
-from datetime import datetime
+import hashlib
+from flask import Response, request
 
-def format_date(date_str):
-    """Format date strings consistently for API responses"""
-    if not date_str or str(date_str).strip() == '':
-        return None
-    try:
-        # Se já for um objeto datetime, retorna direto
-        if isinstance(date_str, datetime):
-            return date_str.isoformat()
-        
-        # Tenta converter do formato brasileiro (DD/MM/YY HH:mm)
-        try:
-            return datetime.strptime(str(date_str), '%d/%m/%y %H:%M').isoformat()
-        except ValueError:
-            # Se falhar, tenta o formato padrão
-            return datetime.strptime(str(date_str), '%Y-%m-%d %H:%M:%S').isoformat()
-    except Exception as e:
-        print(f"Erro ao formatar data {date_str}: {str(e)}")
-        return None
+def make_etag(*parts):
+    """Build a compact ETag value from the given parts (route key, data version...)"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+def is_not_modified(etag, last_modified=None):
+    """Check the conditional request headers against the current ETag / Last-Modified"""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 7232, 6)
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return request.if_modified_since >= last_modified
+    return False
+
+def not_modified_response(etag, last_modified=None):
+    """Empty 304 response carrying the validators"""
+    response = Response(status=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag / Last-Modified so clients can revalidate instead of re-downloading"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -84,6 +84,44 @@ const mockUsers: LoginContact[] = [
   }
 ];
 
+// Last response per URL, reused when the API answers 304 Not Modified
+const responseCache = new Map<string, { etag: string; data: ServiceOrder[] }>();
+
+// Columnar payload (?format=columns): field names once, one array of values per order
+interface ColumnarServiceOrders {
+  columns: (keyof ServiceOrder)[];
+  rows: unknown[][];
+}
+
+const fromColumns = ({ columns, rows }: ColumnarServiceOrders): ServiceOrder[] =>
+  rows.map((values) => {
+    const order: Record<string, unknown> = {};
+    columns.forEach((column, i) => {
+      order[column] = values[i];
+    });
+    return order as unknown as ServiceOrder;
+  });
+
+const fetchServiceOrders = async (baseUrl: string, errorMessage: string): Promise<ServiceOrder[]> => {
+  const url = `${baseUrl}${baseUrl.includes('?') ? '&' : '?'}format=columns`;
+  const cached = responseCache.get(url);
+  const response = await fetch(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  if (!response.ok) {
+    throw new Error(errorMessage);
+  }
+  const data = fromColumns(await response.json());
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    responseCache.set(url, { etag, data });
+  }
+  return data;
+};
+
 // Database functions with improved debugging
 export const findUserByBadge = async (badgeNumber: number): Promise<LoginContact | null> => {
   console.log('[database] Finding user by badge:', badgeNumber);
@@ -100,11 +138,7 @@ export const authenticateUser = async (badgeNumber: number): Promise<LoginContac
 export const getAllServiceOrders = async (): Promise<ServiceOrder[]> => {
   console.log('[database] Getting all service orders from API');
   try {
-    const response = await fetch('http://localhost:5000/api/service-orders');
-    if (!response.ok) {
-      throw new Error('Falha ao buscar ordens de serviço');
-    }
-    const data = await response.json();
+    const data = await fetchServiceOrders('http://localhost:5000/api/service-orders', 'Falha ao buscar ordens de serviço');
     console.log('[database] Fetched service orders:', data.length, 'records');
     return data;
   } catch (error) {
@@ -116,11 +150,7 @@ export const getAllServiceOrders = async (): Promise<ServiceOrder[]> => {
 export const getServiceOrdersByTechnician = async (technicianName: string): Promise<ServiceOrder[]> => {
   console.log('[database] Filtering orders by technician:', technicianName);
   try {
-    const response = await fetch(`http://localhost:5000/api/service-orders/technician/${technicianName}`);
-    if (!response.ok) {
-      throw new Error('Falha ao buscar ordens por técnico');
-    }
-    const data = await response.json();
+    const data = await fetchServiceOrders(`http://localhost:5000/api/service-orders/technician/${technicianName}`, 'Falha ao buscar ordens por técnico');
     console.log('[database] Filtered orders:', data.length, 'records');
     return data;
   } catch (error) {
@@ -132,16 +162,12 @@ export const getServiceOrdersByTechnician = async (technicianName: string): Prom
 export const getServiceOrdersByStatus = async (status: string, technicianName?: string): Promise<ServiceOrder[]> => {
   console.log('[database] Filtering orders by status:', status, 'and technician:', technicianName);
   try {
-    const response = await fetch(`http://localhost:5000/api/service-orders/status/${status}`);
-    if (!response.ok) {
-      throw new Error('Falha ao buscar ordens por status');
-    }
-    let data = await response.json();
-    
-    // Filtrar por técnico se necessário
+    // O filtro por técnico é aplicado no banco pela API
+    const params = new URLSearchParams({ status });
     if (technicianName && technicianName !== 'TODOS') {
-      data = data.filter((order: ServiceOrder) => order.atend_dia === technicianName);
+      params.set('technician', technicianName);
     }
+    const data = await fetchServiceOrders(`http://localhost:5000/api/service-orders/query?${params}`, 'Falha ao buscar ordens por status');
     
     console.log('[database] Filtered orders by status and technician:', data.length, 'records');
     return data;
@@ -154,11 +180,7 @@ export const getServiceOrdersByStatus = async (status: string, technicianName?:
 export const getNewServiceOrders = async (): Promise<ServiceOrder[]> => {
   console.log('[database] Getting new service orders (no technician assigned)');
   try {
-    const response = await fetch('http://localhost:5000/api/service-orders/new');
-    if (!response.ok) {
-      throw new Error('Falha ao buscar novas ordens');
-    }
-    const data = await response.json();
+    const data = await fetchServiceOrders('http://localhost:5000/api/service-orders/new', 'Falha ao buscar novas ordens');
     console.log('[database] New orders found:', data.length, 'records');
     return data;
   } catch (error) {
@@ -170,11 +192,7 @@ export const getNewServiceOrders = async (): Promise<ServiceOrder[]> => {
 export const getTodayServiceOrders = async (): Promise<ServiceOrder[]> => {
   console.log('[database] Getting today service orders');
   try {
-    const response = await fetch('http://localhost:5000/api/service-orders/today');
-    if (!response.ok) {
-      throw new Error('Falha ao buscar ordens do dia');
-    }
-    const data = await response.json();
+    const data = await fetchServiceOrders('http://localhost:5000/api/service-orders/today', 'Falha ao buscar ordens do dia');
     console.log('[database] Today orders found:', data.length, 'records');
     return data;
   } catch (error) {
@@ -183,6 +201,65 @@ export const getTodayServiceOrders = async (): Promise<ServiceOrder[]> => {
   }
 };
 
+export interface ServiceOrderStatsEntry {
+  name: string;
+  total: number;
+}
+
+export interface ServiceOrderStats {
+  total: number;
+  by_technician: (ServiceOrderStatsEntry & { by_status: Record<string, number> })[];
+  by_status: ServiceOrderStatsEntry[];
+  by_sector: ServiceOrderStatsEntry[];
+  aging: Record<string, number>;
+}
+
+// Aggregated counts of the open orders, computed server-side
+export const getServiceOrderStats = async (): Promise<ServiceOrderStats | null> => {
+  console.log('[database] Getting service order stats');
+  try {
+    const response = await fetch('http://localhost:5000/api/service-orders/stats');
+    if (!response.ok) {
+      throw new Error('Falha ao buscar estatísticas das ordens');
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('[database] Error fetching service order stats:', error);
+    return null;
+  }
+};
+
+export interface ServiceOrderChanges {
+  version: string;
+  inserted: ServiceOrder[];
+  updated: ServiceOrder[];
+  removed: string[];
+}
+
+// Live updates via Server-Sent Events; EventSource resumes with Last-Event-ID on reconnect
+export const subscribeServiceOrderChanges = (
+  onSnapshot: (orders: ServiceOrder[]) => void,
+  onChanges: (changes: ServiceOrderChanges) => void,
+  onUnavailable?: () => void
+): (() => void) => {
+  console.log('[database] Subscribing to service order changes');
+  const source = new EventSource('http://localhost:5000/api/service-orders/stream');
+  source.addEventListener('snapshot', (event) => {
+    onSnapshot(JSON.parse((event as MessageEvent).data).rows);
+  });
+  source.addEventListener('change', (event) => {
+    onChanges(JSON.parse((event as MessageEvent).data));
+  });
+  source.onerror = (error) => {
+    console.error('[database] Service order stream error:', error);
+    // CLOSED means the server refused the stream (e.g. 503 when every slot is taken): poll instead
+    if (source.readyState === EventSource.CLOSED) {
+      onUnavailable?.();
+    }
+  };
+  return () => source.close();
+};
+
 // Save user to localStorage
 export const saveUserToStorage = (user: LoginContact): void => {
   localStorage.setItem('user', JSON.stringify({
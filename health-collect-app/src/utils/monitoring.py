@@ -0,0 +1,234 @@
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Endpoint local de saúde/métricas (porta 0 desativa)
+METRICS_HOST = os.environ.get('ACMA_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('ACMA_METRICS_PORT', 9101))
+# Sem confirmação de dados atualizados por mais que isso (segundos), /health responde 503
+STALE_AFTER = float(os.environ.get('ACMA_STALE_AFTER', 600))
+CYCLE_HISTORY = int(os.environ.get('ACMA_CYCLE_HISTORY', 50))
+
+# Capturas de tela/HTML de erros, com rotação
+CAPTURE_DIR = os.environ.get('ACMA_CAPTURE_DIR', 'acma_captures')
+CAPTURE_KEEP = int(os.environ.get('ACMA_CAPTURE_KEEP', 20))
+
+class CollectorMetrics:
+    """Métricas por ciclo do coletor, compartilhadas entre o scraper e o gravador"""
+
+    def __init__(self, history=CYCLE_HISTORY):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.cycles = deque(maxlen=history)
+        self.current = None
+        self.totals = {'cycles': 0, 'failures': 0, 'writes': 0, 'write_failures': 0}
+        self.last = {}              # etapa -> duração do último ciclo em que ocorreu
+        self.last_diff = None
+        self.last_scrape_at = None  # último scrape bem-sucedido
+        self.last_commit_at = None  # última gravação concluída
+        self.fresh_at = None        # último instante em que o banco coincidia com o painel
+        self.writer_failing = False
+
+    def start_cycle(self):
+        with self._lock:
+            self.current = {'started_at': time.time(), 'timings': {}}
+
+    def record(self, stage, seconds):
+        """Registra a duração de uma etapa (page_load, extraction, db_write...)"""
+        with self._lock:
+            self.last[stage] = seconds
+            if self.current is not None and stage != 'db_write':
+                self.current['timings'][stage] = round(seconds, 4)
+
+    def end_cycle(self, ok, records=0, changed=False, error=None):
+        now = time.time()
+        with self._lock:
+            cycle = self.current or {'started_at': now, 'timings': {}}
+            cycle.update({
+                'ok': ok,
+                'records': records,
+                'changed': changed,
+                'duration': round(now - cycle['started_at'], 4)
+            })
+            if error is not None:
+                cycle['error'] = str(error)
+            self.cycles.append(cycle)
+            self.current = None
+            self.totals['cycles'] += 1
+            if ok:
+                self.last_scrape_at = now
+                # Snapshot idêntico ao já gravado: o banco continua atualizado
+                if not changed and not self.writer_failing and self.last_commit_at is not None:
+                    self.fresh_at = now
+            else:
+                self.totals['failures'] += 1
+
+    def record_diff(self, changes):
+        with self._lock:
+            self.last_diff = {
+                'inserted': len(changes.inserted),
+                'updated': len(changes.updated),
+                'removed': len(changes.removed)
+            }
+
+    def record_write(self, ok, seconds):
+        """Resultado do gravador: True quando o banco ficou consistente com o snapshot"""
+        now = time.time()
+        with self._lock:
+            self.last['db_write'] = seconds
+            self.writer_failing = not ok
+            if ok:
+                self.totals['writes'] += 1
+                self.last_commit_at = self.fresh_at = now
+            else:
+                self.totals['write_failures'] += 1
+
+    def staleness(self, now=None):
+        """Segundos desde a última confirmação de que o banco reflete o painel"""
+        reference = self.fresh_at or self.started_at
+        return (now or time.time()) - reference
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            staleness = self.staleness(now)
+            return {
+                'status': 'stale' if staleness > STALE_AFTER else 'ok',
+                'staleness': round(staleness, 1),
+                'stale_after': STALE_AFTER,
+                'uptime': round(now - self.started_at, 1),
+                'last_scrape_at': _iso(self.last_scrape_at),
+                'last_commit_at': _iso(self.last_commit_at),
+                'writer_failing': self.writer_failing,
+                'last_timings': {stage: round(value, 4) for stage, value in self.last.items()},
+                'last_diff': self.last_diff,
+                'totals': dict(self.totals),
+                'last_cycle': self.cycles[-1] if self.cycles else None
+            }
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            '# TYPE acma_staleness_seconds gauge',
+            f"acma_staleness_seconds {snapshot['staleness']}",
+            '# TYPE acma_writer_failing gauge',
+            f"acma_writer_failing {int(snapshot['writer_failing'])}"
+        ]
+        lines.append('# TYPE acma_stage_seconds gauge')
+        for stage, value in snapshot['last_timings'].items():
+            lines.append(f'acma_stage_seconds{{stage="{stage}"}} {value}')
+        lines.append('# TYPE acma_last_diff_rows gauge')
+        for kind, value in (snapshot['last_diff'] or {}).items():
+            lines.append(f'acma_last_diff_rows{{kind="{kind}"}} {value}')
+        for name, value in snapshot['totals'].items():
+            lines.append(f'# TYPE acma_{name}_total counter')
+            lines.append(f'acma_{name}_total {value}')
+        if snapshot['last_cycle'] is not None:
+            lines.append('# TYPE acma_last_cycle_records gauge')
+            lines.append(f"acma_last_cycle_records {snapshot['last_cycle']['records']}")
+        return '\n'.join(lines) + '\n'
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+metrics = CollectorMetrics()
+
+class timed:
+    """Mede a duração de um bloco e registra em `metrics` com o nome da etapa"""
+
+    def __init__(self, stage, collector=None):
+        self.stage = stage
+        self.collector = collector or metrics
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.collector.record(self.stage, self.elapsed)
+        return False
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    collector = metrics
+
+    def do_GET(self):
+        if self.path == '/health':
+            snapshot = self.collector.snapshot()
+            self._send(200 if snapshot['status'] == 'ok' else 503, 'application/json',
+                       json.dumps(snapshot, ensure_ascii=False))
+        elif self.path == '/metrics':
+            self._send(200, 'text/plain; version=0.0.4', self.collector.render_prometheus())
+        elif self.path == '/cycles':
+            with self.collector._lock:
+                cycles = list(self.collector.cycles)
+            self._send(200, 'application/json', json.dumps(cycles, ensure_ascii=False))
+        else:
+            self._send(404, 'application/json', json.dumps({'error': 'Não encontrado'}))
+
+    def _send(self, status, content_type, body):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Sem log por requisição: o endpoint é consultado com frequência pelo monitoramento
+        pass
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Sobe o endpoint /health, /metrics e /cycles numa thread daemon; None se desativado"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Não foi possível abrir o endpoint de métricas em {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='acma-metrics', daemon=True).start()
+    print(f"Métricas do coletor em http://{host}:{server.server_port}/metrics")
+    return server
+
+class CaptureStore:
+    """Guarda capturas de tela e HTML de erros com data/hora, mantendo só as `keep` mais recentes"""
+
+    def __init__(self, directory=CAPTURE_DIR, keep=CAPTURE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def capture(self, page, reason):
+        """Salva <timestamp>_<reason>.png e .html; falhas na captura nunca propagam"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            base = os.path.join(self.directory, f"{stamp}_{reason}")
+            page.screenshot(path=base + '.png')
+            with open(base + '.html', 'w', encoding='utf-8') as f:
+                f.write(page.content())
+            print(f"Captura salva em {base}.png")
+        except Exception as e:
+            print(f"Falha ao salvar captura: {e}")
+        self.prune()
+
+    def prune(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return
+        captures = sorted({os.path.splitext(name)[0] for name in names})
+        for base in captures[:-self.keep] if self.keep else captures:
+            for extension in ('.png', '.html'):
+                try:
+                    os.remove(os.path.join(self.directory, base + extension))
+                except FileNotFoundError:
+                    pass
+
+captures = CaptureStore()
@@ -0,0 +1,64 @@
+
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from src.api.classification import is_supply
+
+# Formato exibido pelo painel ACMA e formato gravado no banco
+PANEL_DATE_FORMAT = "%d/%m/%y %H:%M"
+DB_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Técnicos do painel que contam como "sem atendente"
+UNASSIGNED_MARKERS = ("GARDEN/PERES",)
+
+# Escala de plantão: nos dias da semana indicados, ordens sem atendente são
+# atribuídas à equipe teams[dia_do_ano % len(teams)]
+RotationRule = namedtuple('RotationRule', ['weekdays', 'teams'])
+
+ROTATION_RULES = [
+    RotationRule(weekdays=(5, 6), teams=("MARCOS, WESLLEY", "KAUA, SARA"))
+]
+
+@lru_cache(maxsize=4096)
+def parse_panel_date(value):
+    """Converte a data do painel uma única vez; o cache evita reprocessar as mesmas datas a cada ciclo"""
+    return datetime.strptime(value, PANEL_DATE_FORMAT)
+
+def rotation_team(dt, rules=ROTATION_RULES):
+    """Equipe de plantão para a data, ou None fora da escala"""
+    for rule in rules:
+        if dt.weekday() in rule.weekdays:
+            return rule.teams[dt.timetuple().tm_yday % len(rule.teams)]
+    return None
+
+def normalize_row(row_data, rules=ROTATION_RULES):
+    """Normaliza uma linha do painel (atendente, data, escala e classificação)"""
+    if any(marker in row_data['atend_dia'] for marker in UNASSIGNED_MARKERS):
+        row_data['atend_dia'] = ""
+
+    supply = is_supply(row_data['servico_sol'])
+    row_data['fl_suprimento'] = int(supply)
+
+    try:
+        dt = parse_panel_date(row_data['solicitacao'])
+    except ValueError as e:
+        print(f"Erro ao formatar a data: {e}")
+        return row_data
+
+    row_data['solicitacao'] = dt.strftime(DB_DATE_FORMAT)
+    if not row_data['atend_dia'] and not supply:
+        team = rotation_team(dt, rules)
+        if team:
+            row_data['atend_dia'] = team
+
+    return row_data
+
+def normalize_snapshot(rows, rules=ROTATION_RULES):
+    """Normaliza o snapshot inteiro de uma vez, descartando linhas inválidas"""
+    normalized = []
+    for row_data in rows:
+        try:
+            normalized.append(normalize_row(row_data, rules))
+        except Exception as e:
+            print(f"Erro ao processar linha: {e}")
+    return normalized
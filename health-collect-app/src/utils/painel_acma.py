@@ -1,11 +1,23 @@
 from playwright.sync_api import sync_playwright
-from datetime import datetime
-import re
+from collections import namedtuple
+import hashlib
 import mysql.connector
 import time
 import sys
+import os
 from prettytable import PrettyTable
 
+# Permite executar tanto com `python -m src.utils.painel_acma` quanto diretamente
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.api.classification import reclassify_supplies
+from src.api.migrations import apply_migrations
+from src.api.stats import refresh_backlog_stats
+from src.utils.monitoring import captures, metrics, start_metrics_server, timed
+from src.utils.normalization import normalize_snapshot
+from src.utils.pipeline import IngestWorker
+from src.utils.scheduler import AdaptiveInterval, FailureBackoff
+
 def create_connection():
     try:
         connection = mysql.connector.connect(
@@ -21,230 +33,444 @@ def create_connection():
         print(f"Erro de conexão MySQL: {err}")
         return None
 
+GRID_ID = 'portlet_filha_2517_61965_pageVisualiza_grid'
+
+# Linhas por página pedidas ao portlet; páginas excedentes são percorridas pelo grid
+ROWS_PER_PAGE = int(os.environ.get('ACMA_ROWS_PER_PAGE', 500))
+
+TABLE_FIELDS = ('cd_os', 'solicitacao', 'previsao', 'servico_sol', 'setor_sol', 'solicitante', 'atend_dia')
+
+# Extrai todas as linhas visíveis do grid em uma única ida ao navegador
+EXTRACT_ROWS_JS = """
+(gridId) => {
+    const rows = document.querySelectorAll(`tr[id^="${gridId}_DXDataRow"]`);
+    const data = [];
+    for (const row of rows) {
+        const cells = row.querySelectorAll('td.dxgv');
+        if (cells.length < 7) continue;
+        const values = [];
+        for (let i = 0; i < 7; i++) values.push(cells[i].innerText.trim());
+        data.push(values);
+    }
+    return data;
+}
+"""
+
+# Estado do grid quando nada foi extraído: a linha "sem dados" do DevExpress
+# confirma um painel vazio; sem ela, o grid ainda não foi renderizado
+GRID_STATE_JS = """
+(gridId) => ({
+    dataRows: document.querySelectorAll(`tr[id^="${gridId}_DXDataRow"]`).length,
+    emptyRow: document.getElementById(`${gridId}_DXEmptyRow`) !== null
+})
+"""
+
+# Acesso ao objeto cliente do ASPxGridView (DevExpress)
+GRID_CLIENT_JS = """
+const grid = window[gridId] || (window.ASPxClientControl
+    && ASPxClientControl.GetControlCollection().Get(gridId));
+"""
+
+PAGE_COUNT_JS = """
+(gridId) => {""" + GRID_CLIENT_JS + """
+    return grid && grid.GetPageCount ? grid.GetPageCount() : 1;
+}
+"""
+
+GOTO_PAGE_JS = """
+([gridId, index]) => {""" + GRID_CLIENT_JS + """
+    grid.GotoPage(index);
+}
+"""
+
+PAGE_READY_JS = """
+([gridId, index]) => {""" + GRID_CLIENT_JS + """
+    return grid && !grid.InCallback() && grid.GetPageIndex() === index;
+}
+"""
+
+def goto_grid_page(page, index):
+    page.evaluate(GOTO_PAGE_JS, [GRID_ID, index])
+    page.wait_for_function(PAGE_READY_JS, arg=[GRID_ID, index], timeout=45000)
+
 def fetch_dynamic_table_data(page):
     try:
-        table = page.wait_for_selector(
-            'table#portlet_filha_2517_61965_pageVisualiza_grid_DXMainTable',
+        page.wait_for_selector(
+            f'table#{GRID_ID}_DXMainTable',
             state="attached",
             timeout=45000
         )
-        
-        data = []
-        rows = table.query_selector_all('tr[id^="portlet_filha_2517_61965_pageVisualiza_grid_DXDataRow"]')
-        
-        for row in rows:
-            try:
-                cols = row.query_selector_all('td.dxgv')
-                if len(cols) < 7:
-                    continue
-                    
-                row_data = {
-                    'cd_os': cols[0].inner_text().strip(),
-                    'solicitacao': cols[1].inner_text().strip(),
-                    'previsao': cols[2].inner_text().strip(),
-                    'servico_sol': cols[3].inner_text().strip(),
-                    'setor_sol': cols[4].inner_text().strip(),
-                    'solicitante': cols[5].inner_text().strip(),
-                    'atend_dia': cols[6].inner_text().strip()
-                }
-                
-                row_data = process_row_data(row_data)
-                data.append(row_data)
-                
-            except Exception as e:
-                print(f"Erro ao processar linha: {e}")
-                continue
-        
+
+        raw_rows = page.evaluate(EXTRACT_ROWS_JS, GRID_ID)
+        page_count = page.evaluate(PAGE_COUNT_JS, GRID_ID) or 1
+        for index in range(1, page_count):
+            goto_grid_page(page, index)
+            raw_rows.extend(page.evaluate(EXTRACT_ROWS_JS, GRID_ID))
+        if page_count > 1:
+            # Volta à primeira página para o próximo ciclo
+            goto_grid_page(page, 0)
+
+        if not raw_rows:
+            # Painel sem ordens abertas é um snapshot válido (esvazia tb_manu_compara);
+            # grid sem a linha "sem dados" é falha de extração, não painel vazio
+            state = page.evaluate(GRID_STATE_JS, GRID_ID)
+            if state['dataRows'] or not state['emptyRow']:
+                raise RuntimeError(f"Grid sem linhas extraíveis (linhas de dados: {state['dataRows']})")
+            return []
+
+        # Indexado por cd_os: o grid pode deslocar linhas entre páginas durante a paginação
+        rows = {values[0]: dict(zip(TABLE_FIELDS, values)) for values in raw_rows}
+        data = normalize_snapshot(list(rows.values()))
+        if not data:
+            raise RuntimeError(f"Nenhuma das {len(rows)} linhas do grid pôde ser normalizada")
         return data
-        
+
     except Exception as e:
         print(f"Erro durante a extração: {e}")
-        page.screenshot(path='scraping_error.png')
+        captures.capture(page, 'scraping_error')
         raise
 
-def process_row_data(row_data):
-    if "GARDEN/PERES" in row_data['atend_dia']:
-        row_data['atend_dia'] = ""
+# Campos gravados em tb_top_rank que entram na detecção de mudanças
+COMPARED_FIELDS = ('solicitacao', 'previsao', 'servico_sol', 'setor_sol', 'solicitante', 'atend_dia', 'fl_suprimento')
 
-    try:
-        dt = datetime.strptime(row_data['solicitacao'], "%d/%m/%y %H:%M")
-        row_data['solicitacao'] = dt.strftime("%Y-%m-%d %H:%M:%S")
-    except ValueError as e:
-        print(f"Erro ao formatar a data: {e}")
+LOOKUP_BATCH_SIZE = 500
 
-    try:
-        dt_obj = datetime.strptime(row_data['solicitacao'], "%Y-%m-%d %H:%M:%S")
-        dia_da_semana = dt_obj.weekday()
-        dia_do_ano = (dt_obj - datetime(dt_obj.year, 1, 1)).days + 1
-        
-        palavras_proibidas = [
-            "TONNER", "toner", "tuner", "tunner", "tonner",
-            "TOWNER", "TOWNE", "TORNER", "TORNE", 
-            "CARTUCHO", "CATUCHO", "CARTUXO", 
-            "colorida", "coloridas", "color", 
-            "camera", "cameras"
-        ]
-        
-        padrao = r'\b(?:' + '|'.join(map(re.escape, palavras_proibidas)) + r')\b'
-        
-        if not row_data['atend_dia'] and not re.search(padrao, row_data['servico_sol'], re.IGNORECASE):
-            if dia_da_semana >= 5:
-                row_data['atend_dia'] = "MARCOS, WESLLEY" if (dia_do_ano % 2 == 0) else "KAUA, SARA"
-    
-    except Exception as e:
-        print(f"Erro no processamento de datas: {e}")
-    
-    return row_data
+ChangeSet = namedtuple('ChangeSet', ['inserted', 'updated', 'removed', 'compara_ids'])
+
+def row_hash(row):
+    """Hash do conteúdo de uma linha, comparável entre o scraping e o banco"""
+    values = ('' if row.get(field) is None else str(row[field]) for field in COMPARED_FIELDS)
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
 
 def check_and_update_data(connection, data):
-    cursor = connection.cursor(dictionary=True)
-    updated_data = []
+    """Compara o snapshot com o banco em lote (sem uma consulta por linha).
 
-    for row in data:
-        cursor.execute("SELECT * FROM tb_top_rank WHERE cd_os = %s", (row['cd_os'],))
-        existing_row = cursor.fetchone()
+    Retorna um ChangeSet com as linhas novas, as alteradas, os cd_os que
+    saíram do painel e os cd_os atualmente em tb_manu_compara.
+    """
+    cursor = connection.cursor()
+    existing_hashes = {}
+    columns = ', '.join(('cd_os',) + COMPARED_FIELDS)
 
-        if existing_row:
-            if any(existing_row[field] != row[field] for field in row if field != 'cd_os'):
-                updated_data.append(row)
-        else:
-            updated_data.append(row)
+    try:
+        cd_os_list = [row['cd_os'] for row in data]
+        for start in range(0, len(cd_os_list), LOOKUP_BATCH_SIZE):
+            batch = cd_os_list[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"SELECT {columns} FROM tb_top_rank WHERE cd_os IN ({placeholders})", tuple(batch))
+            for values in cursor.fetchall():
+                existing_hashes[values[0]] = row_hash(dict(zip(COMPARED_FIELDS, values[1:])))
 
-    cursor.close()
-    return updated_data
+        cursor.execute("SELECT cd_os_manu_compara FROM tb_manu_compara")
+        compara_ids = {values[0] for values in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    inserted = [row for row in data if row['cd_os'] not in existing_hashes]
+    updated = [row for row in data
+               if row['cd_os'] in existing_hashes and existing_hashes[row['cd_os']] != row_hash(row)]
+    current = set(cd_os_list)
+    removed = sorted(compara_ids - current)
+    return ChangeSet(inserted, updated, removed, compara_ids)
+
+SQL_UPSERT_TOP_RANK = """
+INSERT INTO tb_top_rank (cd_os, solicitacao, previsao, servico_sol, setor_sol, solicitante, atend_dia, fl_suprimento)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+solicitacao = VALUES(solicitacao),
+previsao = VALUES(previsao),
+servico_sol = VALUES(servico_sol),
+setor_sol = VALUES(setor_sol),
+solicitante = VALUES(solicitante),
+atend_dia = VALUES(atend_dia),
+fl_suprimento = VALUES(fl_suprimento),
+timestamp = CURRENT_TIMESTAMP
+"""
+
+SQL_INSERT_MANU_COMPARA = """
+INSERT INTO tb_manu_compara 
+(cd_os_manu_compara, solicitacao_manu_compara, previsao_manu_compara, 
+ servico_sol_manu_compara, setor_sol_manu_compara, 
+ solicitante_manu_compara, atend_dia_manu_compara)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+def sync_manu_compara(cursor, data, changes):
+    """Aplica em tb_manu_compara apenas a diferença para o snapshot atual.
+
+    Roda na mesma transação do upsert, então quem lê nunca vê a tabela vazia
+    ou pela metade. Retorna True se algo mudou.
+    """
+    existing = changes.compara_ids
+    changed = {row['cd_os'] for row in changes.inserted + changes.updated}
+
+    stale = set(changes.removed) | (existing & changed)
+    if stale:
+        placeholders = ', '.join(['%s'] * len(stale))
+        cursor.execute(
+            f"DELETE FROM tb_manu_compara WHERE cd_os_manu_compara IN ({placeholders})",
+            tuple(stale)
+        )
 
-def insert_data(data):
+    to_insert = [row for row in data if row['cd_os'] not in existing or row['cd_os'] in changed]
+    if to_insert:
+        cursor.executemany(SQL_INSERT_MANU_COMPARA, [
+            (row['cd_os'], row['solicitacao'], row['previsao'],
+             row['servico_sol'], row['setor_sol'],
+             row['solicitante'], row['atend_dia'])
+            for row in to_insert
+        ])
+    return bool(stale or to_insert)
+
+def insert_data(data, changes=None):
+    """Grava o snapshot; `changes` (de SnapshotTracker) dispensa a comparação com o banco.
+
+    Retorna True quando o banco ficou consistente com o snapshot.
+    """
     connection = create_connection()
     if not connection:
-        return
+        return False
 
+    cursor = None
     try:
-        updated_data = check_and_update_data(connection, data)
-        if not updated_data:
-            return
+        if changes is None:
+            changes = check_and_update_data(connection, data)
+        updated_data = changes.inserted + changes.updated
+        print(f"Alterações: {len(changes.inserted)} novas, {len(changes.updated)} atualizadas, {len(changes.removed)} removidas")
+        metrics.record_diff(changes)
 
         cursor = connection.cursor()
 
-        sql_insert_query = """
-        INSERT INTO tb_top_rank (cd_os, solicitacao, previsao, servico_sol, setor_sol, solicitante, atend_dia)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        solicitacao = VALUES(solicitacao),
-        previsao = VALUES(previsao),
-        servico_sol = VALUES(servico_sol),
-        setor_sol = VALUES(setor_sol),
-        solicitante = VALUES(solicitante),
-        atend_dia = VALUES(atend_dia),
-        timestamp = CURRENT_TIMESTAMP
-        """
-        
-        cursor.execute("TRUNCATE TABLE tb_manu_compara")
-        
-        for row in updated_data:
-            cursor.execute(sql_insert_query, (
-                row['cd_os'], row['solicitacao'], row['previsao'], 
-                row['servico_sol'], row['setor_sol'], 
-                row['solicitante'], row['atend_dia']
-            ))
-            
-            cursor.execute("""
-            INSERT INTO tb_manu_compara 
-            (cd_os_manu_compara, solicitacao_manu_compara, previsao_manu_compara, 
-             servico_sol_manu_compara, setor_sol_manu_compara, 
-             solicitante_manu_compara, atend_dia_manu_compara)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                row['cd_os'], row['solicitacao'], row['previsao'], 
-                row['servico_sol'], row['setor_sol'], 
-                row['solicitante'], row['atend_dia']
-            ))
-
-        connection.commit()
+        # Upsert em lote: um único INSERT multi-linha para todas as alterações
+        if updated_data:
+            cursor.executemany(SQL_UPSERT_TOP_RANK, [
+                (row['cd_os'], row['solicitacao'], row['previsao'],
+                 row['servico_sol'], row['setor_sol'],
+                 row['solicitante'], row['atend_dia'], row['fl_suprimento'])
+                for row in updated_data
+            ])
+
+        compara_changed = sync_manu_compara(cursor, data, changes)
+
+        if updated_data or compara_changed:
+            # Agregados do backlog na mesma transação: a API nunca vê estatísticas de outro snapshot
+            refresh_backlog_stats(cursor)
+            connection.commit()
+        else:
+            connection.rollback()
+        return True
 
     except mysql.connector.Error as error:
         print(f"Erro no banco de dados: {error}")
+        connection.rollback()
+        return False
     finally:
         if connection.is_connected():
-            cursor.close()
+            if cursor:
+                cursor.close()
             connection.close()
 
+Snapshot = namedtuple('Snapshot', ['fingerprint', 'hashes', 'changes'])
+
+def snapshot_fingerprint(data, hashes=None):
+    """Hash ordenado de todas as linhas do snapshot"""
+    if hashes is None:
+        hashes = {row['cd_os']: row_hash(row) for row in data}
+    ordered = '\n'.join(f"{row['cd_os']}:{hashes[row['cd_os']]}" for row in data)
+    return hashlib.sha1(ordered.encode('utf-8')).hexdigest()
+
+class SnapshotTracker:
+    """Guarda a impressão digital do último snapshot gravado.
+
+    Ciclos com o mesmo fingerprint não tocam no banco; nos demais, apenas a
+    diferença por linha é repassada para insert_data.
+    """
+
+    def __init__(self):
+        self.fingerprint = None
+        self.hashes = {}
+
+    def compare(self, data):
+        """Retorna None se nada mudou; senão um Snapshot (changes=None sem base anterior)"""
+        hashes = {row['cd_os']: row_hash(row) for row in data}
+        fingerprint = snapshot_fingerprint(data, hashes)
+        if fingerprint == self.fingerprint:
+            return None
+
+        if self.fingerprint is None:
+            return Snapshot(fingerprint, hashes, None)
+
+        previous = self.hashes
+        changes = ChangeSet(
+            inserted=[row for row in data if row['cd_os'] not in previous],
+            updated=[row for row in data
+                     if row['cd_os'] in previous and previous[row['cd_os']] != hashes[row['cd_os']]],
+            removed=sorted(set(previous) - set(hashes)),
+            compara_ids=set(previous)
+        )
+        return Snapshot(fingerprint, hashes, changes)
+
+    def accept(self, snapshot):
+        self.fingerprint = snapshot.fingerprint
+        self.hashes = snapshot.hashes
+
+    def reset(self):
+        """Esquece a base (após falha de gravação) para comparar com o banco de novo"""
+        self.fingerprint = None
+        self.hashes = {}
+
+LOGIN_URL = 'http://200.155.115.161:8081/PAINEL/ACCOUNT/LOGIN_NEW.ASPX?chave=Lz60TZqzQj7TTfHZn%2ffTqx%2b78Fa%2f3inndN%2beqM%2b7Tj8APynT9RibM4zkjvDyMtRG51NjA7ZiHqJ5NSv91fitWw%3d%3d'
+PANEL_URL = f'http://200.155.115.161:8081/Painel/Portlets/portlet_frame.aspx?CdPlanilha=0&CdPortlet=2517&CdPortletConfig=61965&pTipoPortlet=SQL&ExibirPrompt=false&ExistePrompt=false&PromptRespondido=false&LinhasPorPaginaConfigPortal={ROWS_PER_PAGE}&Height=724&Width=1517&IsConfirmacao=N&isAtualizacao=S'
+
+# Recarga preventiva do painel (segundos)
+RELOAD_INTERVAL = float(os.environ.get('ACMA_RELOAD_INTERVAL', 300))
+
+def launch_browser(p):
+    # Configuração para execução em segundo plano
+    browser = p.chromium.launch(
+        headless=True,  # AGORA ESTÁ EM MODO HEADLESS
+        timeout=60000,
+        args=[
+            '--disable-gpu',
+            '--disable-dev-shm-usage',
+            '--no-sandbox',
+            '--disable-extensions',
+            '--mute-audio',
+            '--window-size=1920,1080',
+            '--start-maximized'
+        ],
+        chromium_sandbox=False
+    )
+    
+    context = browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    )
+    return browser, context
+
+def open_panel(page):
+    print("Acessando sistema...")
+    page.goto(LOGIN_URL, timeout=60000, wait_until="domcontentloaded")
+    page.goto(PANEL_URL, timeout=60000, wait_until="networkidle")
+
+def recover(page, failures):
+    """Recuperação em degraus: recarregar, refazer login e só então relançar o navegador.
+
+    Retorna False quando é preciso relançar o navegador.
+    """
+    try:
+        if failures == 1:
+            print("Recarregando o painel...")
+            page.reload(timeout=60000, wait_until="networkidle")
+            return True
+        if failures == 2:
+            open_panel(page)
+            return True
+    except Exception as e:
+        print(f"Falha na recuperação: {e}")
+    return False
+
+def write_snapshot(tracker, data):
+    """Grava a diferença para o último snapshot gravado; retorna False se o banco falhou"""
+    snapshot = tracker.compare(data)
+    if snapshot is None:
+        return True
+    if snapshot.changes is not None and not any(snapshot.changes[:3]):
+        # Só a ordem das linhas mudou
+        tracker.accept(snapshot)
+        metrics.record_write(True, 0.0)
+        return True
+    start = time.perf_counter()
+    ok = insert_data(data, snapshot.changes)
+    metrics.record_write(ok, time.perf_counter() - start)
+    if ok:
+        tracker.accept(snapshot)
+        return True
+    tracker.reset()
+    return False
+
 def main_loop():
+    # Produtor (scraper, esta thread) e consumidor (gravador) ligados por uma fila limitada
+    tracker = SnapshotTracker()
+    writer = IngestWorker(lambda data: write_snapshot(tracker, data))
+    writer.start()
+
+    start_metrics_server()
+    interval = AdaptiveInterval.from_env()
+    backoff = FailureBackoff.from_env()
+    last_fingerprint = None
     with sync_playwright() as p:
-        while True:
-            try:
-                # Configuração para execução em segundo plano
-                browser = p.chromium.launch(
-                    headless=True,  # AGORA ESTÁ EM MODO HEADLESS
-                    timeout=60000,
-                    args=[
-                        '--disable-gpu',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox',
-                        '--disable-extensions',
-                        '--mute-audio',
-                        '--window-size=1920,1080',
-                        '--start-maximized'
-                    ],
-                    chromium_sandbox=False
-                )
-                
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                )
-                
-                page = context.new_page()
-                
-                print("Acessando sistema...")
-                page.goto(
-                    'http://200.155.115.161:8081/PAINEL/ACCOUNT/LOGIN_NEW.ASPX?chave=Lz60TZqzQj7TTfHZn%2ffTqx%2b78Fa%2f3inndN%2beqM%2b7Tj8APynT9RibM4zkjvDyMtRG51NjA7ZiHqJ5NSv91fitWw%3d%3d',
-                    timeout=60000,
-                    wait_until="domcontentloaded"
-                )
-                
-                page.goto(
-                    'http://200.155.115.161:8081/Painel/Portlets/portlet_frame.aspx?CdPlanilha=0&CdPortlet=2517&CdPortletConfig=61965&pTipoPortlet=SQL&ExibirPrompt=false&ExistePrompt=false&PromptRespondido=false&LinhasPorPaginaConfigPortal=50&Height=724&Width=1517&IsConfirmacao=N&isAtualizacao=S',
-                    timeout=60000,
-                    wait_until="networkidle"
-                )
-                
-                last_count = 0
-                while True:
-                    try:
-                        print("Verificando novos dados...")
+        browser = page = None
+        loaded_at = 0
+        try:
+            while True:
+                metrics.start_cycle()
+                try:
+                    # Um único navegador e sessão enquanto estiverem saudáveis
+                    if browser is None or not browser.is_connected():
+                        with timed('page_load'):
+                            browser, context = launch_browser(p)
+                            page = context.new_page()
+                            open_panel(page)
+                        loaded_at = time.monotonic()
+                    elif time.monotonic() - loaded_at >= RELOAD_INTERVAL:
+                        with timed('page_load'):
+                            page.reload(timeout=60000, wait_until="networkidle")
+                        loaded_at = time.monotonic()
+
+                    print("Verificando novos dados...")
+                    with timed('extraction'):
                         data = fetch_dynamic_table_data(page)
-                        
-                        if data:
-                            print(f"Encontrados {len(data)} registros")
-                            if len(data) != last_count:
-                                insert_data(data)
-                                last_count = len(data)
-                            else:
-                                print("Nenhuma alteração detectada")
-                        
-                        time.sleep(12)
-                        
-                        if len(data) > 0 and int(datetime.now().strftime('%M')) % 5 == 0:
-                            page.reload()
-                            time.sleep(5)
-                            
-                    except Exception as e:
-                        print(f"Erro no loop de verificação: {e}")
-                        page.screenshot(path='loop_error.png')
-                        break
-                
-            except Exception as e:
-                print(f"Erro principal: {e}")
-            finally:
-                if 'browser' in locals():
-                    browser.close()
-                time.sleep(10)
+
+                    # Um painel vazio também é gravado, para remover as ordens que fecharam
+                    print(f"Encontrados {len(data)} registros" if data else "Painel sem ordens abertas")
+                    fingerprint = snapshot_fingerprint(data)
+                    changed = fingerprint != last_fingerprint
+                    if changed:
+                        writer.submit(data)
+                        last_fingerprint = fingerprint
+                    else:
+                        print("Nenhuma alteração detectada")
+
+                    metrics.end_cycle(True, len(data), changed)
+                    backoff.success()
+                    time.sleep(interval.next_delay(changed))
+
+                except Exception as e:
+                    print(f"Erro no loop de verificação: {e}")
+                    metrics.end_cycle(False, error=e)
+                    if page is not None:
+                        captures.capture(page, 'loop_error')
+                    delay = backoff.failure()
+                    if page is None or not recover(page, backoff.failures):
+                        print("Relançando o navegador...")
+                        if browser is not None:
+                            try:
+                                browser.close()
+                            except Exception:
+                                pass
+                        browser = page = None
+                    else:
+                        loaded_at = time.monotonic()
+                    print(f"Nova tentativa em {delay:.0f}s")
+                    time.sleep(delay)
+        finally:
+            writer.stop()
+            if browser is not None:
+                browser.close()
 
 if __name__ == "__main__":
     try:
         # Verifica a conexão com o banco primeiro
         test_conn = create_connection()
         if test_conn:
+            apply_migrations(test_conn)
+            if '--reclassify' in sys.argv:
+                # Recalcula fl_suprimento após mudanças em FILTER_PATTERNS; na mesma transação
+                # reconstrói tb_stats_backlog e atualiza o timestamp, invalidando o cache da API
+                print(f"Registros reclassificados: {reclassify_supplies(test_conn)}")
+                test_conn.close()
+                sys.exit(0)
             print("Conexão com o banco OK. Iniciando monitoramento...")
             test_conn.close()
             main_loop()
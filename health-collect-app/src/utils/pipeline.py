@@ -0,0 +1,132 @@
+
+import json
+import os
+import queue
+import threading
+import time
+from src.utils.scheduler import FailureBackoff
+
+QUEUE_SIZE = int(os.environ.get('ACMA_QUEUE_SIZE', 1))
+SPOOL_DIR = os.environ.get('ACMA_SPOOL_DIR', 'acma_spool')
+
+_STOP = object()
+
+class LatestQueue:
+    """Fila limitada entre o scraper e o gravador: quando cheia, o item mais antigo é descartado"""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def put(self, item):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.coalesced += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+class SnapshotSpool:
+    """Guarda em disco o último snapshot não gravado, para reenviar após reconexão ou reinício"""
+
+    def __init__(self, directory=SPOOL_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, 'snapshot.json')
+
+    def save(self, data):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'rows': data}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)['rows']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            print(f"Spool inválido descartado: {e}")
+            self.clear()
+            return None
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class IngestWorker(threading.Thread):
+    """Consumidor que grava snapshots no banco sem bloquear o scraper.
+
+    `write(data)` deve retornar True quando o banco ficou consistente. Em caso
+    de falha o snapshot vai para o spool e é reenviado com backoff exponencial;
+    um snapshot mais novo sempre substitui o pendente.
+    """
+
+    def __init__(self, write, snapshots=None, spool=None, backoff=None):
+        super().__init__(name='acma-ingest', daemon=True)
+        self.write = write
+        self.snapshots = snapshots or LatestQueue()
+        self.spool = spool or SnapshotSpool()
+        self.backoff = backoff or FailureBackoff.from_env()
+
+    def submit(self, data):
+        self.snapshots.put(data)
+
+    def stop(self):
+        self.snapshots.put(_STOP)
+
+    def run(self):
+        pending = self.spool.load()
+        if pending is not None:
+            print(f"Reenviando snapshot do spool ({len(pending)} registros)")
+        retry_at = 0.0
+
+        while True:
+            timeout = None if pending is None else max(0.0, retry_at - time.monotonic())
+            try:
+                item = self.snapshots.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                # O mais recente vence
+                pending = item
+                if time.monotonic() < retry_at:
+                    self.spool.save(pending)
+                    continue
+            if pending is None:
+                continue
+
+            try:
+                ok = self.write(pending)
+            except Exception as e:
+                print(f"Erro no gravador: {e}")
+                ok = False
+
+            if ok:
+                pending = None
+                retry_at = 0.0
+                self.spool.clear()
+                self.backoff.success()
+            else:
+                self.spool.save(pending)
+                delay = self.backoff.failure()
+                retry_at = time.monotonic() + delay
+                print(f"Gravação falhou; snapshot no spool, nova tentativa em {delay:.0f}s")
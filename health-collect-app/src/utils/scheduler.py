@@ -0,0 +1,80 @@
+
+import os
+from datetime import datetime
+
+def parse_windows(value):
+    """Converte "07:00-19:00,20:00-22:00" em [((7, 0), (19, 0)), ...]"""
+    windows = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, end = part.split('-')
+        windows.append(tuple(tuple(int(x) for x in t.split(':')) for t in (start, end)))
+    return windows
+
+class AdaptiveInterval:
+    """Intervalo de coleta que acelera após uma mudança e desacelera enquanto nada muda.
+
+    Fora das janelas de expediente o intervalo é fixo em `off_hours_interval`.
+    """
+
+    def __init__(self, min_interval=5, max_interval=60, factor=1.5,
+                 business_hours=None, off_hours_interval=120):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.business_hours = business_hours or []
+        self.off_hours_interval = off_hours_interval
+        self.current = min_interval
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_interval=float(os.environ.get('ACMA_MIN_INTERVAL', 5)),
+            max_interval=float(os.environ.get('ACMA_MAX_INTERVAL', 60)),
+            factor=float(os.environ.get('ACMA_BACKOFF_FACTOR', 1.5)),
+            business_hours=parse_windows(os.environ.get('ACMA_BUSINESS_HOURS', '')),
+            off_hours_interval=float(os.environ.get('ACMA_OFF_HOURS_INTERVAL', 120))
+        )
+
+    def in_business_hours(self, now=None):
+        if not self.business_hours:
+            return True
+        now = now or datetime.now()
+        current = (now.hour, now.minute)
+        return any(start <= current < end for start, end in self.business_hours)
+
+    def next_delay(self, changed, now=None):
+        """Segundos até o próximo ciclo, dado se o ciclo atual encontrou mudanças"""
+        if changed:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.current * self.factor, self.max_interval)
+        if not self.in_business_hours(now):
+            return max(self.current, self.off_hours_interval)
+        return self.current
+
+class FailureBackoff:
+    """Backoff exponencial para falhas consecutivas"""
+
+    def __init__(self, base=5, maximum=300, factor=2):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base=float(os.environ.get('ACMA_RETRY_BASE', 5)),
+            maximum=float(os.environ.get('ACMA_RETRY_MAX', 300))
+        )
+
+    def failure(self):
+        """Registra uma falha e retorna quantos segundos esperar"""
+        self.failures += 1
+        return min(self.base * self.factor ** (self.failures - 1), self.maximum)
+
+    def success(self):
+        self.failures = 0
@@ -0,0 +1,72 @@
+
+import asyncio
+import pytest
+
+aiomysql = pytest.importorskip('aiomysql')
+pymysql = pytest.importorskip('pymysql')
+
+from src.api.async_database import AsyncDatabase, escape_literal_percent
+from src.api.queries import build_count_query, build_service_orders_query, decode_cursor, encode_cursor
+
+class FakeConnection:
+    """Enough of an aiomysql connection for Cursor.execute to build the final SQL"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self._result = None
+        self.executed = []
+
+    def escape(self, value):
+        return pymysql.converters.escape_item(value, 'utf8')
+
+    def cursor(self, cursor_class):
+        connection = self
+
+        class RecordingCursor(cursor_class):
+            async def _query(self, query):
+                connection.executed.append(query)
+                self._rows = ()
+
+        return RecordingCursor(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakePool:
+    def __init__(self):
+        self.connection = None
+
+    def acquire(self):
+        self.connection = FakeConnection()
+        return self.connection
+
+def run_async_query(query, params):
+    """SQL that AsyncDatabase sends for (query, params), through aiomysql's own interpolation"""
+    db = AsyncDatabase()
+    db._pool = FakePool()
+    asyncio.run(db._execute(query, params))
+    return db._pool.connection.executed[0]
+
+def test_parameterized_list_query_keeps_date_formats():
+    query, params = build_service_orders_query({'technician': 'JOAO'}, limit=10)
+    sql = run_async_query(query, params)
+    assert "'%Y-%m-%dT%T'" in sql
+    assert "'%d/%m/%y %H:%i'" in sql
+    assert "tr.atend_dia = 'JOAO'" in sql
+    assert 'LIMIT 11' in sql
+
+def test_cursor_query_binds_every_parameter():
+    cursor = decode_cursor(encode_cursor({'solicitacao': '2026-10-18T10:00:00', 'cd_os': '1001'}))
+    query, params = build_service_orders_query({'status': 'Aberta'}, order='asc', limit=5, cursor=cursor)
+    sql = run_async_query(query, params)
+    assert '%s' not in sql
+    assert "'2026-10-18 10:00:00'" in sql
+
+def test_queries_without_parameters_are_left_as_is():
+    query, params = build_count_query({})
+    assert params == ()
+    assert escape_literal_percent(query, params) == query
+    assert "%" not in run_async_query(query, params).replace(query, '')
@@ -0,0 +1,69 @@
+
+import threading
+import time
+from datetime import date, datetime
+import pytest
+import src.api.cache as cache_module
+from src.api.cache import DataVersion, ResultCache
+
+class FakeDatabase:
+    """execute_query stand-in counting probes, slow like a connect timeout when down"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.up = False
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def execute_query(self, query, params=None):
+        with self._lock:
+            self.probes += 1
+        time.sleep(self.delay)
+        if not self.up:
+            return None, "Falha na conexão com o banco de dados"
+        return [{'last_update': datetime(2026, 10, 18, 10, 0), 'compara_count': 5, 'today': date(2026, 10, 18)}], None
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(cache_module, 'execute_query', fake.execute_query)
+    return fake
+
+def run_concurrently(function, count=8):
+    results = [None] * count
+
+    def worker(index):
+        results[index] = function()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - start
+
+def test_outage_costs_one_probe_per_interval(database):
+    version = DataVersion(ResultCache(), check_interval=0.5)
+    results, elapsed = run_concurrently(version.current)
+    assert results == [None] * 8
+    assert database.probes == 1
+    assert elapsed < 2 * database.delay
+
+    # The failure is remembered for the interval
+    assert version.current() is None
+    assert database.probes == 1
+
+def test_others_keep_the_last_version_while_one_probes(database):
+    database.up = True
+    version = DataVersion(ResultCache(), check_interval=0.3)
+    first = version.current()
+    assert first.endswith(':5:2026-10-18')
+
+    time.sleep(0.35)
+    database.up = False
+    results, elapsed = run_concurrently(version.current)
+    assert database.probes == 2
+    # Only the probing thread saw the failure; the rest answered from the last version at once
+    assert results.count(None) == 1
+    assert results.count(first) == 7
@@ -0,0 +1,60 @@
+
+import pytest
+import src.api.changes as changes
+from src.api.changes import ChangeFeed
+
+class FakeVersion:
+    def __init__(self):
+        self.version = None
+
+    def current(self):
+        return self.version
+
+@pytest.fixture
+def version(monkeypatch):
+    fake = FakeVersion()
+    monkeypatch.setattr(changes, 'data_version', fake)
+    return fake
+
+def order(cd_os, atend_dia=''):
+    return {'cd_os': cd_os, 'atend_dia': atend_dia}
+
+def test_no_snapshot_until_a_baseline_is_loaded(version):
+    state = {'rows': None, 'error': 'Falha na conexão com o banco de dados'}
+    feed = ChangeFeed(lambda: (state['rows'], state['error']))
+
+    # Version probe failing, then the snapshot query failing
+    assert feed.snapshot() is None
+    version.version = 'v1'
+    assert feed.snapshot() is None
+
+    state.update(rows=[order('1001'), order('1002')], error=None)
+    seq, rows = feed.snapshot()
+    assert [row['cd_os'] for row in rows] == ['1001', '1002']
+
+def test_changes_after_the_snapshot_are_events(version):
+    rows = [order('1001'), order('1002')]
+    feed = ChangeFeed(lambda: (list(rows), None))
+    version.version = 'v1'
+    seq, _ = feed.snapshot()
+
+    rows[:] = [order('1001', 'KAUA, SARA'), order('1003')]
+    version.version = 'v2'
+    feed.poll()
+    events = feed.events_since(seq)
+    assert len(events) == 1
+    data = events[0][1]
+    assert [row['cd_os'] for row in data['inserted']] == ['1003']
+    assert [row['cd_os'] for row in data['updated']] == ['1001']
+    assert data['removed'] == ['1002']
+
+def test_failed_reload_keeps_the_previous_state(version):
+    state = {'rows': [order('1001')], 'error': None}
+    feed = ChangeFeed(lambda: (state['rows'], state['error']))
+    version.version = 'v1'
+    seq, _ = feed.snapshot()
+
+    state.update(rows=None, error='Falha na conexão com o banco de dados')
+    version.version = 'v2'
+    assert feed.snapshot() == (seq, [order('1001')])
+    assert feed.events_since(seq) == []
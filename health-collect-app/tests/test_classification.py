@@ -0,0 +1,112 @@
+
+import pytest
+from src.api.classification import is_supply, reclassify_supplies
+from src.api.migrations import MIGRATIONS
+from src.api.stats import REFRESH_BACKLOG_STATS
+
+@pytest.mark.parametrize('servico_sol', [
+    'Troca de toner',
+    'TONER DA IMPRESSORA DA RECEPÇÃO ACABOU',
+    'Solicito 2 toners para o faturamento',
+    'Trocar cartucho colorida',
+    'CARTUCHOS DA HP 664',
+    'Impressora pedindo tonner',
+    'Impressão colorida saindo manchada',
+    'TV da sala de espera sem sinal',
+    'Instalar TVs no refeitório',
+    'Televisão do quarto 12 não liga',
+    'Camera do estacionamento desligada',
+    'Câmeras: trocar cameras do corredor',
+])
+def test_supply_descriptions(servico_sol):
+    assert is_supply(servico_sol)
+
+@pytest.mark.parametrize('servico_sol', [
+    'Favor retorne ligação para o ramal 2045',
+    'Torneira da copa vazando',
+    'Contorne o problema reiniciando o computador',
+    'Atualizar o sistema TASY',
+    'Sem acesso à rede, cabo RJ45 com defeito',
+    'Configurar e-mail no Outlook',
+    'Computador não liga',
+    'Reinstalar antivírus',
+    'Monitor piscando (tvout)',
+    '',
+    None,
+])
+def test_non_supply_descriptions(servico_sol):
+    assert not is_supply(servico_sol)
+
+class FakeCursor:
+    """tb_top_rank as a dict, answering the keyset SELECT and the UPDATE of reclassify_supplies"""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+        self.selects = 0
+        self.updates = []
+        self.statements = []
+
+    def execute(self, query, params=None):
+        if not query.startswith('SELECT cd_os'):
+            self.statements.append(query)
+            return
+        last_cd_os, limit = params
+        self.selects += 1
+        self.rows = [(cd_os, servico, flag) for cd_os, (servico, flag) in sorted(self.table.items())
+                     if cd_os > last_cd_os][:limit]
+
+    def fetchall(self):
+        return self.rows
+
+    def executemany(self, query, params):
+        self.updates.append(query)
+        for flag, cd_os in params:
+            self.table[cd_os] = (self.table[cd_os][0], flag)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, table):
+        self.cursor_ = FakeCursor(table)
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.commits += 1
+
+def test_reclassify_reads_in_batches_and_fixes_flags():
+    table = {
+        '1001': ('Troca de toner', 0),
+        '1002': ('Favor retorne ligação', 1),
+        '1003': ('Computador não liga', 0),
+        '1004': ('TV sem sinal', 1),
+        '1005': ('Torneira vazando', 1),
+    }
+    connection = FakeConnection(table)
+    assert reclassify_supplies(connection, batch_size=2) == 3
+    assert {cd_os: flag for cd_os, (_, flag) in table.items()} == \
+        {'1001': 1, '1002': 0, '1003': 0, '1004': 1, '1005': 0}
+    assert connection.cursor_.selects == 4
+    assert connection.commits == 1
+
+def test_reclassify_bumps_the_data_version_and_rebuilds_the_stats_in_its_transaction():
+    connection = FakeConnection({'1001': ('Troca de toner', 0)})
+    assert reclassify_supplies(connection) == 1
+    assert all('timestamp = CURRENT_TIMESTAMP' in query for query in connection.cursor_.updates)
+    assert connection.cursor_.statements == REFRESH_BACKLOG_STATS
+    assert connection.commits == 1
+
+def test_reclassify_without_changes_leaves_the_stats_alone():
+    connection = FakeConnection({'1001': ('Troca de toner', 1)})
+    assert reclassify_supplies(connection) == 0
+    assert connection.cursor_.statements == []
+
+def test_first_migration_runs_before_the_stats_table_exists():
+    connection = FakeConnection({'1001': ('Troca de toner', 0)})
+    step = MIGRATIONS[0][2][-1]
+    assert step(connection) == 1
+    assert connection.cursor_.statements == []
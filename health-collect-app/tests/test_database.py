@@ -0,0 +1,64 @@
+
+import threading
+import pytest
+import src.api.database as database
+from src.api.database import StreamLimitReached, get_stream_stats, stream_query
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def execute(self, query, params):
+        pass
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.in_use = 0
+        self.discarded = 0
+
+    def acquire(self):
+        self.in_use += 1
+        return self
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self.rows)
+
+    def release(self, connection, discard=False):
+        self.in_use -= 1
+        self.discarded += int(discard)
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool([{'cd_os': str(1000 + i)} for i in range(5)])
+    monkeypatch.setattr(database, 'pool', fake)
+    monkeypatch.setattr(database, '_stream_budget', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(database, 'STREAM_MAX_CONNECTIONS', 2)
+    return fake
+
+def test_streams_beyond_the_budget_are_refused(pool):
+    first = stream_query("SELECT 1", batch_size=2)
+    second = stream_query("SELECT 1", batch_size=2)
+    assert next(first) and next(second)
+    assert pool.in_use == 2
+
+    third = stream_query("SELECT 1", batch_size=2)
+    with pytest.raises(StreamLimitReached):
+        next(third)
+    assert pool.in_use == 2
+
+    # Closing a half-read stream frees its slot and discards the connection
+    first.close()
+    assert pool.in_use == 1 and pool.discarded == 1
+    fourth = stream_query("SELECT 1", batch_size=2)
+    assert [row['cd_os'] for batch in fourth for row in batch] == ['1000', '1001', '1002', '1003', '1004']
+    second.close()
+    assert pool.in_use == 0
+    assert get_stream_stats()['active'] == 0
@@ -0,0 +1,38 @@
+
+from src.api.explain import check_routes
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+
+    def fetchall(self):
+        return [{'table': 'tr', 'type': 'ref', 'key': 'idx_top_rank_sit'}]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.statements)
+
+def test_routes_are_explained_as_they_run():
+    connection = FakeConnection()
+    report = check_routes(connection)
+    assert {'all', 'new', 'today', 'pending', 'technician', 'status', 'query', 'query date range'} <= set(report)
+    for query, params in connection.statements:
+        assert query.startswith('EXPLAIN ')
+        assert 'LIMIT' not in query
+    assert all(scans == [] for plan, scans in report.values())
+
+def test_date_range_case_uses_both_bounds():
+    connection = FakeConnection()
+    check_routes(connection)
+    query, params = connection.statements[-1]
+    assert 'tr.solicitacao >= %s' in query and 'tr.solicitacao < %s' in query
+    assert len(params) == 2
@@ -0,0 +1,38 @@
+
+import json
+from src.api import metrics
+from src.api.metrics import Counter, Histogram
+
+def test_counter_merge_sums_processes():
+    a = Counter('c_total', 'test', ('route',))
+    b = Counter('c_total', 'test', ('route',))
+    a.inc('/x')
+    a.inc('/y')
+    b.inc('/x', amount=3)
+    values = {}
+    Counter.merge(values, a.state())
+    Counter.merge(values, b.state())
+    assert values == {('/x',): 4, ('/y',): 1}
+
+def test_histogram_merge_sums_buckets():
+    a = Histogram('h_seconds', 'test', ('route',), (0.1, 1.0))
+    b = Histogram('h_seconds', 'test', ('route',), (0.1, 1.0))
+    a.observe(0.05, '/x')
+    b.observe(0.5, '/x')
+    values = {}
+    Histogram.merge(values, a.state())
+    Histogram.merge(values, b.state())
+    samples = {(name, key): value for name, labels, key, value in a.samples(values)}
+    assert samples[('h_seconds_bucket', ('/x', 0.1))] == 1
+    assert samples[('h_seconds_bucket', ('/x', 1.0))] == 2
+    assert samples[('h_seconds_count', ('/x',))] == 2
+
+def test_collect_metrics_reads_every_worker_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    other = Counter(metrics.REQUEST_ERRORS.name, 'test', metrics.REQUEST_ERRORS.labels)
+    other.inc('/api/other-worker', 500, amount=2)
+    (tmp_path / '1.json').write_text(json.dumps({other.name: other.state()}))
+    merged = metrics.collect_metrics()
+    assert merged[other.name][('/api/other-worker', 500)] == 2
+    # This process's own file was written too
+    assert len(list(tmp_path.glob('*.json'))) == 2
@@ -0,0 +1,225 @@
+
+import mysql.connector
+import pytest
+
+# The collector imports the browser driver and the console table at module level
+pytest.importorskip('playwright.sync_api')
+pytest.importorskip('prettytable')
+
+from src.api.stats import REFRESH_BACKLOG_STATS
+from src.utils import painel_acma
+from src.utils.painel_acma import (COMPARED_FIELDS, SnapshotTracker, check_and_update_data,
+                                   sync_manu_compara, write_snapshot)
+
+class FakeDatabase:
+    """tb_top_rank and tb_manu_compara; writes only become visible on commit"""
+
+    def __init__(self):
+        self.top_rank = {}
+        self.compara = set()
+        self.commits = 0
+        self.stats_refreshes = 0
+        # Statement prefix that raises mysql.connector.Error once
+        self.fail_on = None
+
+    def connect(self):
+        return FakeConnection(self)
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def _fail(self, query):
+        database = self.connection.database
+        if database.fail_on and query.strip().startswith(database.fail_on):
+            database.fail_on = None
+            raise mysql.connector.Error("Lost connection to MySQL server during query")
+
+    def execute(self, query, params=None):
+        self._fail(query)
+        connection = self.connection
+        connection.statements.append((query, params))
+        if 'FROM tb_top_rank WHERE cd_os IN' in query:
+            self.rows = [(cd_os,) + tuple(connection.top_rank[cd_os][field] for field in COMPARED_FIELDS)
+                         for cd_os in params if cd_os in connection.top_rank]
+        elif query.startswith('SELECT cd_os_manu_compara'):
+            self.rows = [(cd_os,) for cd_os in sorted(connection.compara)]
+        elif query.startswith('DELETE FROM tb_manu_compara'):
+            connection.compara -= set(params)
+        elif query == REFRESH_BACKLOG_STATS[0]:
+            connection.stats_refreshes += 1
+        elif query not in REFRESH_BACKLOG_STATS:
+            raise AssertionError(f"Consulta inesperada: {query}")
+
+    def executemany(self, query, rows):
+        self._fail(query)
+        connection = self.connection
+        rows = list(rows)
+        connection.statements.append((query, rows))
+        for values in rows:
+            if 'INTO tb_manu_compara' in query:
+                connection.compara.add(values[0])
+            else:
+                connection.top_rank[values[0]] = dict(zip(COMPARED_FIELDS, values[1:]))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.statements = []
+        self.rollback()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.database.top_rank = {cd_os: dict(row) for cd_os, row in self.top_rank.items()}
+        self.database.compara = set(self.compara)
+        self.database.stats_refreshes += self.stats_refreshes
+        self.database.commits += 1
+
+    def rollback(self):
+        self.top_rank = {cd_os: dict(row) for cd_os, row in self.database.top_rank.items()}
+        self.compara = set(self.database.compara)
+        self.stats_refreshes = 0
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+def order(cd_os, atend_dia='', servico_sol='Computador não liga'):
+    return {
+        'cd_os': cd_os,
+        'solicitacao': '2026-10-18 08:00:00',
+        'previsao': None,
+        'servico_sol': servico_sol,
+        'setor_sol': 'UTI',
+        'solicitante': 'MARIA',
+        'atend_dia': atend_dia,
+        'fl_suprimento': 0
+    }
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(painel_acma, 'create_connection', database.connect)
+    return database
+
+def assert_mirrors(database, data):
+    """The database holds exactly the panel's open orders, with their current values"""
+    assert database.compara == {row['cd_os'] for row in data}
+    for row in data:
+        assert database.top_rank[row['cd_os']] == {field: row[field] for field in COMPARED_FIELDS}
+
+def test_first_write_is_compared_against_the_database(database):
+    database.top_rank['1'] = {field: order('1')[field] for field in COMPARED_FIELDS}
+    database.compara = {'1', '9'}
+    data = [order('1'), order('2', atend_dia='KAUA, SARA')]
+
+    tracker = SnapshotTracker()
+    assert write_snapshot(tracker, data)
+
+    assert_mirrors(database, data)
+    assert '9' not in database.compara
+    assert database.commits == 1
+    assert database.stats_refreshes == 1
+    assert tracker.fingerprint is not None
+
+def test_check_and_update_data_classifies_rows(database):
+    database.top_rank['1'] = {field: order('1')[field] for field in COMPARED_FIELDS}
+    database.top_rank['2'] = {field: order('2')[field] for field in COMPARED_FIELDS}
+    database.compara = {'1', '2', '3'}
+    data = [order('1'), order('2', atend_dia='KAUA, SARA'), order('4')]
+
+    changes = check_and_update_data(database.connect(), data)
+
+    assert [row['cd_os'] for row in changes.inserted] == ['4']
+    assert [row['cd_os'] for row in changes.updated] == ['2']
+    assert changes.removed == ['3']
+    assert changes.compara_ids == {'1', '2', '3'}
+
+def test_tracker_diff_against_the_last_written_snapshot(database):
+    tracker = SnapshotTracker()
+    first = [order('1'), order('2')]
+    assert write_snapshot(tracker, first)
+
+    second = [order('1'), order('2', atend_dia='KAUA, SARA'), order('3')]
+    snapshot = tracker.compare(second)
+    assert [row['cd_os'] for row in snapshot.changes.inserted] == ['3']
+    assert [row['cd_os'] for row in snapshot.changes.updated] == ['2']
+    assert snapshot.changes.removed == []
+
+    assert write_snapshot(tracker, second)
+    assert_mirrors(database, second)
+
+def test_unchanged_snapshot_does_not_touch_the_database(database):
+    tracker = SnapshotTracker()
+    data = [order('1'), order('2')]
+    assert write_snapshot(tracker, data)
+    assert tracker.compare(list(data)) is None
+    assert write_snapshot(tracker, data)
+    assert database.commits == 1
+
+def test_removed_order_leaves_the_panel_but_keeps_its_history(database):
+    tracker = SnapshotTracker()
+    assert write_snapshot(tracker, [order('1'), order('2')])
+
+    snapshot = tracker.compare([order('1')])
+    assert snapshot.changes.removed == ['2']
+    assert write_snapshot(tracker, [order('1')])
+
+    assert database.compara == {'1'}
+    assert '2' in database.top_rank
+
+def test_sync_manu_compara_rewrites_only_the_difference(database):
+    connection = database.connect()
+    connection.compara = {'1', '2', '3'}
+    data = [order('1'), order('2'), order('4')]
+    changes = painel_acma.ChangeSet(inserted=[data[2]], updated=[data[1]], removed=['3'],
+                                    compara_ids={'1', '2', '3'})
+
+    assert sync_manu_compara(connection.cursor(), data, changes)
+    assert connection.compara == {'1', '2', '4'}
+    # The changed order is deleted and reinserted; the unchanged one is left alone
+    (_, deleted), (_, inserted) = connection.statements
+    assert sorted(deleted) == ['2', '3']
+    assert [values[0] for values in inserted] == ['2', '4']
+
+def test_empty_panel_closes_every_open_order(database):
+    tracker = SnapshotTracker()
+    assert write_snapshot(tracker, [order('1'), order('2')])
+
+    assert write_snapshot(tracker, [])
+    assert database.compara == set()
+    assert set(database.top_rank) == {'1', '2'}
+    assert database.stats_refreshes == 2
+
+def test_empty_panel_on_first_write_clears_a_stale_table(database):
+    database.compara = {'7', '8'}
+    assert write_snapshot(SnapshotTracker(), [])
+    assert database.compara == set()
+
+def test_failed_write_rolls_back_and_the_retry_compares_against_the_database(database):
+    tracker = SnapshotTracker()
+    first = [order('1'), order('2')]
+    assert write_snapshot(tracker, first)
+
+    second = [order('1', atend_dia='KAUA, SARA'), order('3')]
+    database.fail_on = 'INSERT INTO tb_manu_compara'
+    assert not write_snapshot(tracker, second)
+    # Nothing of the failed transaction is visible and the tracker lost its base
+    assert_mirrors(database, first)
+    assert tracker.fingerprint is None
+
+    # The ingest worker resends the same snapshot
+    assert write_snapshot(tracker, second)
+    assert_mirrors(database, second)
+    assert tracker.compare(second) is None
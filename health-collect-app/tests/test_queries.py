@@ -0,0 +1,67 @@
+
+import sqlite3
+import pytest
+from src.api.queries import QueryError, decode_cursor, encode_cursor, keyset_condition
+from src.api.snapshot import Snapshot
+
+# (solicitacao, cd_os); sqlite sorts NULLs like MySQL: first ascending, last descending
+ORDERS = [
+    (None, '1003'), ('2026-10-18T09:00:00', '1001'), (None, '1001'),
+    ('2026-10-18T09:00:00', '1002'), ('2026-10-17T15:30:00', '1004'), (None, '1002')
+]
+
+def sql_page(db, order, limit, cursor):
+    direction = order.upper()
+    where, params = '1 = 1', []
+    if cursor is not None:
+        where, params = keyset_condition(cursor, order)
+        params = [p.replace(' ', 'T') if p == cursor[0] else p for p in params]
+    rows = db.execute(
+        f"SELECT solicitacao, cd_os FROM tb_top_rank tr WHERE {where.replace('%s', '?')} "
+        f"ORDER BY tr.solicitacao {direction}, tr.cd_os {direction} LIMIT ?",
+        params + [limit]
+    ).fetchall()
+    return [{'solicitacao': s, 'cd_os': c} for s, c in rows]
+
+@pytest.fixture
+def db():
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE tb_top_rank (solicitacao TEXT NULL, cd_os TEXT)")
+    connection.executemany("INSERT INTO tb_top_rank VALUES (?, ?)", ORDERS)
+    yield connection
+    connection.close()
+
+def test_cursor_round_trips_null_dates():
+    assert decode_cursor(encode_cursor({'solicitacao': None, 'cd_os': '1003'})) == (None, '1003')
+    assert decode_cursor(encode_cursor({'solicitacao': '2026-10-18T09:00:00', 'cd_os': '1'})) == ('2026-10-18 09:00:00', '1')
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(QueryError):
+        decode_cursor('bm90LWpzb24')
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_keyset_pages_through_null_dates(db, order):
+    expected = sql_page(db, order, 100, None)
+    seen, cursor = [], None
+    while True:
+        page = sql_page(db, order, 1, cursor)
+        if not page:
+            break
+        seen += page
+        cursor = decode_cursor(encode_cursor(page[-1]))
+    assert seen == expected
+    assert len(seen) == len(ORDERS)
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_snapshot_pages_like_mysql(db, order):
+    rows = [{'solicitacao': s, 'cd_os': c, 'atend_dia': '', 'sit': 'Aberta'} for s, c in ORDERS]
+    snapshot = Snapshot('v1:2026-10-18', rows)
+    seen, cursor = [], None
+    while True:
+        page = snapshot.select({}, order, 2, cursor)
+        if not page:
+            break
+        seen += page
+        cursor = decode_cursor(encode_cursor(page[-1]))
+    assert [(r['solicitacao'], r['cd_os']) for r in seen] == \
+        [(r['solicitacao'], r['cd_os']) for r in sql_page(db, order, 100, None)]
@@ -0,0 +1,16 @@
+
+from urllib.parse import parse_qs, urlsplit
+from src.api.app import app
+from src.api.routes.service_orders import next_page_url
+
+def test_next_page_url_keeps_args_and_sets_cursor():
+    with app.test_request_context('/api/service-orders?limit=2&fields=cd_os&cursor=old'):
+        url = urlsplit(next_page_url('new'))
+    assert url.path == '/api/service-orders'
+    assert parse_qs(url.query) == {'limit': ['2'], 'fields': ['cd_os'], 'cursor': ['new']}
+
+def test_next_page_url_with_query_arg_named_like_a_path_variable():
+    with app.test_request_context('/api/service-orders/status/Aberta?status=x&limit=1'):
+        url = urlsplit(next_page_url('abc'))
+    assert url.path == '/api/service-orders/status/Aberta'
+    assert parse_qs(url.query) == {'limit': ['1'], 'cursor': ['abc']}
@@ -0,0 +1,72 @@
+
+import pytest
+import src.api.cache as cache_module
+import src.api.snapshot as snapshot_module
+from src.api.cache import ResultCache
+from src.api.snapshot import OpenOrderSnapshot, Snapshot, collation_key
+
+def order(cd_os, solicitacao, atend_dia='', sit='Aberta', fl_suprimento=0):
+    return {'cd_os': cd_os, 'solicitacao': solicitacao, 'atend_dia': atend_dia, 'sit': sit,
+            'fl_suprimento': fl_suprimento}
+
+ROWS = [
+    order('1001', '2026-10-18T08:00:00', 'KAUÁ, SARA'),
+    order('1002', '2026-10-18T09:00:00', 'MARCOS, WESLLEY', 'Em andamento'),
+    order('1003', '2026-10-17T10:00:00', '', fl_suprimento=1),
+    order('1004', '2026-10-16T10:00:00', 'KAUA, SARA ', 'Aguardando peça'),
+]
+
+def codes(rows):
+    return [row['cd_os'] for row in rows]
+
+def test_collation_key_follows_mysql_general_ci():
+    assert collation_key('Kauá, Sara  ') == collation_key('KAUA, SARA')
+    assert collation_key('AGUARDANDO PEÇA') == collation_key('aguardando peca')
+    assert collation_key(None) == ''
+
+@pytest.mark.parametrize('technician', ['kaua, sara', 'KAUA, SARA', 'Kauá, Sara ', 'KAUÁ, SARA'])
+def test_technician_filter_ignores_case_accents_and_trailing_spaces(technician):
+    snapshot = Snapshot('v1:2026-10-18', ROWS)
+    assert codes(snapshot.select({'technician': technician}, 'asc')) == ['1004', '1001']
+
+def test_status_and_flag_filters():
+    snapshot = Snapshot('v1:2026-10-18', ROWS)
+    assert codes(snapshot.select({'status': 'aguardando peca'})) == ['1004']
+    assert codes(snapshot.select({'unassigned': True})) == ['1003']
+    assert codes(snapshot.select({'unassigned': True, 'exclude_supplies': True})) == []
+    assert codes(snapshot.select({'today': True}, 'asc')) == ['1001', '1002']
+
+def test_building_a_snapshot_leaves_the_source_rows_untouched():
+    rows = [dict(row) for row in ROWS]
+    Snapshot('v1:2026-10-18', rows)
+    assert all('fl_suprimento' in row for row in rows)
+
+class FakeVersion:
+    version = 'v1:2026-10-18'
+
+    def current(self):
+        return self.version
+
+def test_workers_load_the_snapshot_through_the_result_cache(monkeypatch):
+    queries = []
+
+    def execute_query(query, params=None):
+        queries.append(query)
+        return [dict(row) for row in ROWS], None
+
+    version = FakeVersion()
+    monkeypatch.setattr(cache_module, 'cache', ResultCache())
+    monkeypatch.setattr(cache_module, 'data_version', version)
+    monkeypatch.setattr(snapshot_module, 'data_version', version)
+    monkeypatch.setattr(snapshot_module, 'execute_query', execute_query)
+
+    # Two holders stand in for two workers sharing one cache backend
+    first, second = OpenOrderSnapshot(), OpenOrderSnapshot()
+    assert codes(first.select({})[0]) == ['1002', '1001', '1003', '1004']
+    assert codes(second.select({})[0]) == ['1002', '1001', '1003', '1004']
+    assert len(queries) == 1
+
+    version.version = 'v2:2026-10-18'
+    first.select({})
+    second.select({})
+    assert len(queries) == 2